@@ -0,0 +1,113 @@
+""" Grouped aggregation from query parameters, pushed down to a single values().annotate() query """
+
+from typing import Type, Optional, Union
+from django.db.models import Model, QuerySet, Field, Aggregate, Count, Sum, Avg, Min, Max, IntegerField, FloatField, \
+    DecimalField, DurationField
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+AGGREGATES: dict[str, Type[Aggregate]] = {'count': Count, 'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+_NUMERIC_AGGREGATES = {'sum', 'avg'}
+_REPEATABLE_AGGREGATES = {'min', 'max'}  # Whose result doesn't change when rows are repeated.
+_NUMERIC_FIELDS = (IntegerField, FloatField, DecimalField, DurationField)
+
+
+class _Path:
+    """ The field at the end of a lookup path like team_course__course, and what it took to get there. """
+
+    def __init__(self, model: Type[Model], path: str, param: str):
+        self.field: Optional[Field] = None
+        self.models = {model}  # Every model the path joins, changes to them change the result.
+        self.to_many = False  # Whether the path joins a related set, so it multiplies rows.
+        self.joined = ''  # The path up to its last related set, which the rows it reaches are one per.
+        names = []
+        for name in path.split('__'):
+            if self.field is not None:
+                if not self.field.is_relation:
+                    raise ValidationError({param: [f"'{path}' traverses '{self.field.name}', which is not a relation."]})
+                model = self.field.related_model
+                self.models.add(model)
+            try:
+                self.field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError({param: [f"{model.__name__} has no field '{name}'."]})
+            names.append(name)
+            if self.field.one_to_many or self.field.many_to_many:
+                self.to_many, self.joined = True, '__'.join(names)
+        if self.field.is_relation and self.field.related_model is not None and not self.field.concrete:
+            self.models.add(self.field.related_model)
+
+    def repeated_by(self, joins: set[str]) -> Optional[str]:
+        """ :returns: A join of a related set the path doesn't go through, which repeats the rows it reaches, if any. """
+
+        return next((join for join in sorted(joins) if self.joined != join and not self.joined.startswith(f"{join}__")), None)
+
+
+def parse_aggregation(model: Type[Model], group_by: Optional[str], aggregate: Optional[str]) -> tuple[list[str], dict[str, Aggregate], set[Type[Model]]]:
+    """
+    Parse ?group_by=team_course__course,student&aggregate=avg:grade,count:pk
+
+    :param model: Model being aggregated.
+    :param group_by: Comma separated lookup paths to group by, or None to aggregate every object into a single result.
+    :param aggregate: Comma separated function:path pairs, count may be given without a path to count objects.
+
+    :returns: The lookups to group by, the aggregates by their output names (like grade__avg), and every model read.
+    """
+
+    lookups = [lookup.strip() for lookup in (group_by or '').split(',') if lookup.strip()]
+    models = {model}
+    joins = set()  # Related sets joined by any path, each repeats the rows of the paths which don't go through it.
+    for lookup in lookups:
+        path = _Path(model, lookup, 'group_by')
+        models |= path.models
+        joins |= {path.joined} if path.to_many else set()
+
+    specs: list[tuple[str, str, Optional[_Path]]] = []
+    for spec in (spec.strip() for spec in (aggregate or '').split(',') if spec.strip()):
+        function, _, lookup = spec.partition(':')
+        if function not in AGGREGATES:
+            raise ValidationError({'aggregate': [f"Unknown function '{function}', use one of: {', '.join(AGGREGATES)}."]})
+        if not lookup:
+            if function != 'count':
+                raise ValidationError({'aggregate': [f"'{function}' requires a field, like {function}:{model._meta.pk.name}."]})
+            specs.append((function, lookup, None))
+            continue
+
+        path = _Path(model, lookup, 'aggregate')
+        if function in _NUMERIC_AGGREGATES and not isinstance(path.field, _NUMERIC_FIELDS):
+            raise ValidationError({'aggregate': [f"'{function}' requires a numeric field, '{lookup}' is not."]})
+        if path.field.is_relation and function != 'count':
+            raise ValidationError({'aggregate': [f"'{lookup}' is a relation, which can only be counted."]})
+        specs.append((function, lookup, path))
+        models |= path.models
+        joins |= {path.joined} if path.to_many else set()
+
+    aggregates: dict[str, Aggregate] = {}
+    for function, lookup, path in specs:
+        if path is None:  # Objects repeated by joins are counted once.
+            aggregates['count'] = Count('pk', distinct=bool(joins))
+        elif function == 'count' and path.to_many:
+            aggregates[f"{lookup}__{function}"] = Count(lookup, distinct=True)  # Related objects, each counted once.
+        elif function not in _REPEATABLE_AGGREGATES and (join := path.repeated_by(joins)) is not None:
+            raise ValidationError({'aggregate': [f"'{function}:{lookup}' would be computed over the rows repeated by joining "
+                                                 f"'{join}', aggregate it in a separate request."]})
+        else:
+            aggregates[f"{lookup}__{function}"] = AGGREGATES[function](lookup)
+
+    if not aggregates:
+        raise ValidationError({'aggregate': ['At least one aggregate is required, like aggregate=count.']})
+    return lookups, aggregates, models
+
+
+def aggregate_queryset(queryset: QuerySet, lookups: list[str], aggregates: dict[str, Aggregate]) -> Union[list[dict], dict]:
+    """
+    :param queryset: Objects to aggregate.
+    :param lookups: Lookups to group by, from parse_aggregation().
+    :param aggregates: Aggregates by their output names, from parse_aggregation().
+
+    :returns: A dictionary per group, ordered by the groups, or a single dictionary if there is nothing to group by.
+    """
+
+    if not lookups:
+        return queryset.aggregate(**aggregates)
+    return list(queryset.order_by().values(*lookups).annotate(**aggregates).order_by(*lookups))
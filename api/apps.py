@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from . import events  # Publishes committed changes to event subscribers, also when served through WSGI.
+        if getattr(settings, 'API_WARMUP_DEPTHS', ()):
+            # Load the URLconf now, so generic_crud() builds its serializers before the first request arrives.
+            from django.urls import get_resolver
+            get_resolver().url_patterns
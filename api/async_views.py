@@ -0,0 +1,117 @@
+""" Async (ASGI) counterparts of DRF's @api_view and of fetching objects for generic serializers """
+
+from functools import wraps
+from typing import Type, Callable, Awaitable, Union
+from asgiref.sync import sync_to_async
+from django.db.models import Model, QuerySet, prefetch_related_objects
+from django.http import HttpRequest, HttpResponseBase
+from rest_framework.views import APIView
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.serializers import ModelSerializer
+
+from .flat import FlatEncoder, flat_encoder
+
+AsyncHandler = Callable[..., Awaitable[HttpResponseBase]]
+
+
+def async_api_view(http_method_names: list[str]) -> Callable[[AsyncHandler], AsyncHandler]:
+    """
+    Like @api_view, but for coroutines, which Django runs on the event loop when served through ASGI.
+    Authentication, permissions and throttling may query the database, so DRF runs them in a worker thread.
+    @renderer_classes and the other DRF policy decorators may be applied below this one, just like with @api_view.
+
+    :param http_method_names: HTTP methods the view accepts, OPTIONS is always allowed.
+    """
+
+    def decorator(func: AsyncHandler) -> AsyncHandler:
+        view_class: Type[APIView] = type(func.__name__, (APIView,), {
+            'http_method_names': [method.lower() for method in http_method_names] + ['options'],
+            # Never called, like those of @api_view they tell APIView the allowed methods, for the Allow header.
+            **{method.lower(): func for method in http_method_names},
+            **{policy: getattr(func, policy) for policy in ('renderer_classes', 'parser_classes', 'authentication_classes',
+                                                            'throttle_classes', 'permission_classes') if hasattr(func, policy)},
+        })
+
+        @wraps(func)
+        async def view(request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+            self = view_class()
+            self.args, self.kwargs = args, kwargs
+            request = self.request = self.initialize_request(request, *args, **kwargs)
+            self.headers = self.default_response_headers
+            try:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                method = request.method.lower()
+                if method not in self.http_method_names:
+                    raise MethodNotAllowed(request.method)
+                if method == 'options':
+                    response = self.options(request, *args, **kwargs)
+                else:
+                    response = await func(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            return self.finalize_response(request, response, *args, **kwargs)
+
+        view.csrf_exempt = True  # Like APIView.as_view(), SessionAuthentication enforces CSRF itself.
+        return view
+
+    return decorator
+
+
+def _serialize(serializer_class: Type[ModelSerializer], instances: list[Model], many: bool) -> Union[list, dict]:
+    prefetch_related_objects(instances, *serializer_class.query_plan.prefetch_related)
+    return serializer_class(instances if many else instances[0], many=many).data
+
+
+async def _aencode(encoder: FlatEncoder, rows: list[tuple]) -> list[dict]:
+    if not rows:
+        return []
+    related_querysets = encoder.related_querysets([row[-1] for row in rows])
+    return encoder.encode(rows, [[related async for related in queryset] for queryset in related_querysets])
+
+
+async def aserialize_list(serializer_class: Type[ModelSerializer], queryset: QuerySet) -> list:
+    """
+    Fetch and serialize a queryset through the serializer's FlatEncoder or query plan, without blocking the event loop.
+    The objects are fetched with aiterator(), which can't prefetch, so related sets are prefetched afterwards.
+
+    :param serializer_class: Generic serializer with a 'query_plan' attribute.
+    :param queryset: Objects to serialize.
+
+    :returns: The serialized objects.
+    """
+
+    if (encoder := flat_encoder(serializer_class)) is not None:
+        # Django 4.1's aiterator() runs values_list() queries on the event loop, iterating the queryset itself doesn't.
+        return await _aencode(encoder, [row async for row in encoder.rows(queryset)])
+
+    plan = serializer_class.query_plan
+    instances = [instance async for instance in plan._replace(prefetch_related=()).apply(queryset).aiterator()]
+    # Serializing a large list is CPU bound, so it shares the worker thread with the prefetch queries.
+    return await sync_to_async(_serialize)(serializer_class, instances, True)
+
+
+async def aserialize_object(serializer_class: Type[ModelSerializer], queryset: QuerySet, **lookup) -> dict:
+    """ Like aserialize_list(), for the single object matching the lookup, fetched with aget(). """
+
+    if (encoder := flat_encoder(serializer_class)) is not None:
+        return (await _aencode(encoder, [await encoder.rows(queryset).aget(**lookup)]))[0]
+
+    plan = serializer_class.query_plan
+    instance = await plan._replace(prefetch_related=()).apply(queryset).aget(**lookup)
+    return await sync_to_async(_serialize)(serializer_class, [instance], False)
+
+
+def _save(serializer: ModelSerializer) -> dict:
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+async def asave(serializer: ModelSerializer) -> dict:
+    """
+    Validate and save a (writable nested) serializer in a worker thread, since the ORM can't save nested objects asynchronously.
+
+    :returns: The serialized data of the saved object.
+    """
+
+    return await sync_to_async(_save)(serializer)
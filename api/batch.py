@@ -0,0 +1,148 @@
+""" Execution of many generic web API operations in a single request """
+
+import json
+import asyncio
+import logging
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from asgiref.sync import async_to_sync
+from django.db import transaction, connections
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpRequest, HttpResponseBase, QueryDict
+from django.template.response import SimpleTemplateResponse
+from django.urls import reverse, resolve, NoReverseMatch
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+_MAXIMUM_BATCH_SIZE = 50
+_MAXIMUM_CONCURRENT_READS = 4
+_READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Headers of the batch request, which would change the meaning of its sub-requests.
+_EXCLUDED_META = {'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_ACCEPT', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH',
+                  'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE', 'QUERY_STRING', 'wsgi.input'}
+
+
+def _parse_operation(index: int, operation) -> tuple[str, str, Optional[bytes], QueryDict]:
+    """ Validate a sub-request, and find the path of its route. """
+
+    if not isinstance(operation, dict):
+        raise ValidationError({index: ['Expected an object with a method and a route.']})
+    method = str(operation.get('method', 'GET')).upper()
+    route = operation.get('route')
+    if not isinstance(route, str) or not route.startswith('api-'):
+        raise ValidationError({index: ['Expected the name of a generated route, like api-student-list.']})
+    try:
+        url = reverse(route, kwargs={'pk': operation['pk']} if operation.get('pk') is not None else None)
+    except NoReverseMatch:
+        raise ValidationError({index: [f"Unknown route '{route}', or it requires a pk."]})
+
+    params = QueryDict(mutable=True)
+    for key, value in (operation.get('params') or {}).items():
+        params.setlist(key, [str(item) for item in value] if isinstance(value, list) else [str(value)])
+    body = json.dumps(operation['body']).encode() if operation.get('body') is not None else None
+    return method, url, body, params
+
+
+def _sub_request(request: Request, method: str, url: str, body: Optional[bytes], params: QueryDict) -> HttpRequest:
+    """ Create a request for a generated view, authenticated like the batch request. """
+
+    sub_request = HttpRequest()
+    sub_request.method = method
+    sub_request.path = sub_request.path_info = url
+    sub_request.META = {key: value for key, value in request.META.items() if key not in _EXCLUDED_META}
+    sub_request.META |= {'REQUEST_METHOD': method, 'PATH_INFO': url, 'QUERY_STRING': params.urlencode(),
+                         'HTTP_ACCEPT': 'application/json', 'CONTENT_TYPE': 'application/json',
+                         'CONTENT_LENGTH': str(len(body or b''))}
+    sub_request.GET = params
+    sub_request._stream = BytesIO(body or b'')
+    sub_request._read_started = False
+    for attribute in ('user', 'session', 'COOKIES'):
+        if hasattr(request._request, attribute):
+            setattr(sub_request, attribute, getattr(request._request, attribute))
+    sub_request._dont_enforce_csrf_checks = True  # The batch request itself passed the CSRF checks.
+    return sub_request
+
+
+def _response_body(response: HttpResponseBase):
+    if hasattr(response, 'data'):  # DRF responses still hold their data, it doesn't have to be rendered and parsed.
+        return response.data
+    if isinstance(response, SimpleTemplateResponse):
+        response.render()  # Only template responses have no content before they are rendered.
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return json.loads(content) if content else None
+
+
+def _execute(request: Request, method: str, url: str, body: Optional[bytes], params: QueryDict) -> dict:
+    """ Dispatch a sub-request to its view, and describe the response, or the error it failed with. """
+
+    sub_request = _sub_request(request, method, url, body, params)
+    match = resolve(url)
+    view = async_to_sync(match.func) if asyncio.iscoroutinefunction(match.func) else match.func
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+        return {'status': response.status_code, 'body': _response_body(response)}
+    except ObjectDoesNotExist:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+    except Exception:  # Reported as the operation's result, so the operations before it aren't lost.
+        logger.exception("Batch operation %s %s failed", method, url)
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': 'A server error occurred.'}}
+
+
+def _execute_read(request: Request, method: str, url: str, body: Optional[bytes], params: QueryDict) -> dict:
+    """ _execute() in a worker thread, which has its own database connection. """
+
+    try:
+        return _execute(request, method, url, body, params)
+    finally:
+        connections.close_all()
+
+
+@api_view(['POST'])
+def batch(request: Request):
+    """
+    Execute a list of operations on the generated routes, like
+    [{"method": "GET", "route": "api-student-detail", "pk": 3, "params": {"depth": 0}},
+     {"method": "POST", "route": "api-todo-update", "pk": 7, "body": {...}}]
+
+    Operations are executed in order, but consecutive reads are executed concurrently.
+    With ?atomic=true every operation runs in a single transaction, one at a time, and the first failure rolls all of them back.
+
+    :returns: The status and body of each operation, in the order they were received,
+        404 for objects which don't exist and 500 for operations raising any other error.
+        400 when an atomic batch was rolled back, operations after the failed one are reported with 424.
+    """
+
+    if not isinstance(request.data, list) or len(request.data) > _MAXIMUM_BATCH_SIZE:
+        raise ValidationError({'non_field_errors': [f"Expected a list of at most {_MAXIMUM_BATCH_SIZE} operations."]})
+    operations = [_parse_operation(index, operation) for index, operation in enumerate(request.data)]
+
+    if request.GET.get('atomic', '').lower() in ('true', '1'):
+        results = []
+        with transaction.atomic():
+            for operation in operations:
+                results.append(_execute(request, *operation))
+                if results[-1]['status'] >= status.HTTP_400_BAD_REQUEST:
+                    transaction.set_rollback(True)
+                    results += [{'status': status.HTTP_424_FAILED_DEPENDENCY, 'body': None}] * (len(operations) - len(results))
+                    return Response(results, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=_MAXIMUM_CONCURRENT_READS) as executor:
+        reads = []  # Futures of the consecutive reads, which must finish before the next write starts.
+        for method, url, body, params in operations:
+            if method in _READ_METHODS:
+                reads.append(executor.submit(_execute_read, request, method, url, body, params))
+                continue
+            results += [read.result() for read in reads]
+            reads = []
+            results.append(_execute(request, method, url, body, params))
+        results += [read.result() for read in reads]
+    return Response(results)
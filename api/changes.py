@@ -0,0 +1,142 @@
+"""
+Change log of the models exposed through generic_crud(), from which clients can sync incrementally.
+
+Changes are logged within the transaction writing them, but may commit in another order than they were logged in.
+So cursors aren't their ids, but positions given to them once committed, after those of every change committed before.
+"""
+
+from datetime import timedelta
+from typing import Type, Iterable, Optional
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction, connections, router
+from django.db.models import Model, Max, Exists, OuterRef, F, Subquery
+from django.db.models.functions import Coalesce
+
+from .signals import CREATED, UPDATED, DELETED, connect_write_listener
+from .models import Change, PRUNED
+
+_DEFAULT_RETENTION = 7 * 24 * 60 * 60  # Seconds
+_SEQUENCE_LOCK = 0x6170695f6368616e  # PostgreSQL advisory lock, which lets a single transaction at a time give out positions.
+
+_logged_models: dict[str, Type[Model]] = {}
+
+
+def log_changes(model: Type[Model]) -> None:
+    """ Record every write to the model in the change log, within the transaction writing it. """
+
+    _logged_models[model._meta.label_lower] = model
+
+
+def logged_models() -> dict[str, Type[Model]]:
+    """ Models whose changes are logged, by their labels. """
+
+    return dict(_logged_models)
+
+
+def compact_changes() -> int:
+    """
+    Keep only the newest change of each object, as that is all a client syncing past it needs.
+    A creation is carried over to a later update, so the object still shows up as created.
+
+    :returns: The number of changes removed.
+    """
+
+    sequenced = Change.objects.filter(position__isnull=False)
+    newer = sequenced.filter(model=OuterRef('model'), object_pk=OuterRef('object_pk'), position__gt=OuterRef('position'))
+    older_created = sequenced.filter(model=OuterRef('model'), object_pk=OuterRef('object_pk'), position__lt=OuterRef('position'),
+                                     action=CREATED)
+    with transaction.atomic():
+        sequenced.filter(Exists(older_created), ~Exists(newer), action=UPDATED).update(action=CREATED)
+        removed, _ = sequenced.exclude(action=PRUNED).filter(Exists(newer)).delete()
+    return removed
+
+
+def prune_changes(retention: Optional[int] = None) -> int:
+    """
+    Remove changes older than the retention (settings.API_CHANGE_LOG_RETENTION seconds by default).
+    The newest removed change is kept as a marker, so cursors from before it are rejected, rather than silently missing changes.
+
+    :returns: The number of changes removed.
+    """
+
+    if retention is None:
+        retention = getattr(settings, 'API_CHANGE_LOG_RETENTION', _DEFAULT_RETENTION)
+    expired = Change.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention), position__isnull=False)
+    if (horizon := expired.aggregate(horizon=Max('position'))['horizon']) is None:
+        return 0
+    with transaction.atomic():
+        removed, _ = expired.filter(position__lt=horizon).delete()
+        Change.objects.filter(position=horizon).update(action=PRUNED, model='', object_pk='')
+    return removed
+
+
+def horizon() -> int:
+    """ Cursors older than this may have missed pruned changes. """
+
+    return Change.objects.filter(action=PRUNED).aggregate(horizon=Max('position'))['horizon'] or 0
+
+
+def _sequence() -> None:
+    """
+    Give the changes committed since the last call their positions, after those of every change which already has one.
+    Changes still being committed aren't visible yet, they get theirs from a later call, after the ones given now.
+    """
+
+    newest = Change.objects.filter(position__isnull=False).order_by('-position').values('position')[:1]
+    first = Change.objects.filter(position__isnull=True).order_by('id').values('id')[:1]
+    connection = connections[router.db_for_write(Change)]
+    with transaction.atomic(using=connection.alias):
+        if connection.vendor == 'postgresql':  # Elsewhere the database lock taken by the UPDATE already serializes them.
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_SEQUENCE_LOCK])
+        # In the order they were logged in, which changes to the same object are committed in too.
+        Change.objects.filter(position__isnull=True).update(
+            position=F('id') - Subquery(first) + Coalesce(Subquery(newest), 0) + 1)
+
+
+def head() -> int:
+    """ Cursor of the newest committed change, no change committed later can come before it. """
+
+    _sequence()
+    return Change.objects.aggregate(head=Max('position'))['head'] or 0
+
+
+def changes_since(since: int, labels: Iterable[str], limit: int) -> tuple[dict[str, dict[str, list]], int, bool]:
+    """
+    :param since: Cursor returned by a previous call, or by head().
+    :param labels: Labels of the logged models to return changes for.
+    :param limit: Maximum number of changes to read, more may be read by calling again with the returned cursor.
+
+    :returns: The primary keys which were created, updated or deleted, per model label and action.
+        Followed by the cursor to continue from, and whether there are more changes after it.
+    """
+
+    newest = head()  # Read first, changes committed while reading them are left for the next call.
+    rows = list(Change.objects.filter(position__gt=since, position__lte=newest, model__in=list(labels))
+                .order_by('position').values_list('position', 'model', 'object_pk', 'action')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Objects changed several times are reported once, by what happened to them overall.
+    actions: dict[tuple[str, str], str] = {}
+    for _, label, pk, action in rows:
+        previous = actions.pop((label, pk), None)  # Re-inserted, so the order of the log is kept.
+        actions[(label, pk)] = CREATED if previous == CREATED and action == UPDATED else action
+
+    changes: dict[str, dict[str, list]] = {}
+    for (label, pk), action in actions.items():
+        model_changes = changes.setdefault(label, {CREATED: [], UPDATED: [], DELETED: []})
+        model_changes[action].append(_logged_models[label]._meta.pk.to_python(pk))
+    return changes, rows[-1][0] if more else max(newest, since), more
+
+
+def _on_write(model: Type[Model], action: str, pks: tuple) -> None:
+    # Logged in the same transaction as the write, so neither is committed without the other.
+    label = model._meta.label_lower
+    if label not in _logged_models or not pks:  # Writes to unknown sets of rows can't be synced by primary key.
+        return
+    Change.objects.bulk_create([Change(model=label, object_pk=str(pk), action=action) for pk in pks])
+
+
+connect_write_listener(_on_write)
@@ -0,0 +1,231 @@
+""" Cost estimates of generic serializers, checked against a budget before any of their queries run """
+
+import time
+import asyncio
+from enum import Enum
+from functools import wraps
+from contextlib import contextmanager
+from typing import Type, NamedTuple, Iterable, Iterator, Union, Optional, Callable
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, router, OperationalError
+from django.db.models import Model, Prefetch, QuerySet, Field, ForeignObjectRel
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.serializers import ModelSerializer
+
+from .query_plan import QueryPlan
+
+COST_HEADER = 'X-Query-Cost'
+DECISION_HEADER = 'X-Query-Decision'
+ACCEPTED = 'accepted'
+DOWNGRADED = 'downgraded'
+MINIMUM = 'minimum'  # Over budget, but served anyway, as nothing smaller can be served.
+MATERIALIZED = 'materialized'  # Served from stored documents, whatever the depth.
+
+# Endpoint classes, whose statements may run for as long as settings.API_STATEMENT_TIMEOUTS allows them to.
+LIST = 'list'
+DETAIL = 'detail'
+AGGREGATE = 'aggregate'
+WRITE = 'write'
+EXPORT = 'export'  # Limits each FETCH from the server-side cursor, not the whole export.
+
+_STATISTICS_TIMEOUT = 300  # Seconds table sizes are reused for, before they are read again.
+_QUERY_CANCELED = '57014'  # PostgreSQL error code of statements canceled by statement_timeout.
+
+_table_rows: dict[Type[Model], tuple[float, int]] = {}  # {model: (expiry, rows)}
+
+
+class Budget(NamedTuple):
+    """ How much a single read may cost. """
+
+    queries: int = 100
+    rows: int = 100_000  # Estimated objects fetched, including joined and prefetched ones.
+
+
+class OverBudget(Enum):
+    DOWNGRADE = 0  # Serve the deepest ?depth= within the budget instead.
+    REJECT = 1
+
+
+class Cost(NamedTuple):
+    queries: int
+    rows: int
+
+    def __str__(self) -> str:
+        return f"queries={self.queries}, rows={self.rows}"
+
+    def within(self, budget: Budget) -> bool:
+        return self.queries <= budget.queries and self.rows <= budget.rows
+
+
+class QueryTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The query took too long, narrow it down with filters, ?limit= or a smaller ?depth=.'
+    default_code = 'query_timeout'
+
+
+def default_budget() -> Budget:
+    """ The budget of settings.API_QUERY_BUDGET, for models which don't have their own. """
+
+    return Budget(**getattr(settings, 'API_QUERY_BUDGET', {}))
+
+
+def table_rows(model: Type[Model]) -> int:
+    """
+    Number of rows in the model's table, from the PostgreSQL statistics, or counted on other backends.
+    Either is reused for a few minutes, as estimates don't have to be exact.
+    """
+
+    expiry, rows = _table_rows.get(model, (0, 0))
+    if expiry > time.monotonic():
+        return rows
+
+    connection = connections[router.db_for_read(model)]
+    rows = -1
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            rows = int(cursor.fetchone()[0])
+    if rows < 0:  # Not PostgreSQL, or a table which hasn't been analyzed yet.
+        rows = model._base_manager.using(connection.alias).count()
+    _table_rows[model] = (time.monotonic() + _STATISTICS_TIMEOUT, rows)
+    return rows
+
+
+def _relation(model: Type[Model], name: str) -> Union[Field, ForeignObjectRel]:
+    """ Field of the model by name, or related set by accessor name, as used by query plans. """
+
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return next(rel for rel in model._meta.related_objects if rel.get_accessor_name() == name)
+
+
+def _follow(model: Type[Model], lookup: str, rows: float) -> tuple[Type[Model], float]:
+    """
+    :returns: The model at the end of the lookup, and how many of its rows the given rows are related to.
+        Related sets are assumed to be spread evenly over their parents.
+    """
+
+    for name in lookup.split('__'):
+        field = _relation(model, name)
+        related_model = field.related_model
+        if field.many_to_many:  # Each link is a row of the through table.
+            through = field.remote_field.through if field.concrete else field.through
+            rows = min(rows * table_rows(through) / max(table_rows(model), 1), table_rows(through))
+        elif field.one_to_many:
+            rows = min(rows * table_rows(related_model) / max(table_rows(model), 1), table_rows(related_model))
+        else:
+            rows = min(rows, table_rows(related_model))
+        model = related_model
+    return model, rows
+
+
+def _selected(select_related: Union[bool, dict], prefix: str = '') -> list[str]:
+    """ Lookups of a Query.select_related tree, like ['task', 'task__team']. """
+
+    if not isinstance(select_related, dict):
+        return []
+    lookups = []
+    for name, nested in select_related.items():
+        lookups += [f"{prefix}{name}", *_selected(nested, f"{prefix}{name}__")]
+    return lookups
+
+
+def _plan_cost(model: Type[Model], select_related: Iterable[str], prefetch_related: Iterable[Union[str, Prefetch]], rows: float) -> tuple[int, float]:
+    queries, objects = 1, rows
+    for lookup in select_related:  # Joined into the same query, but each row still holds another object.
+        objects += _follow(model, lookup, rows)[1]
+    for prefetch in prefetch_related:
+        if isinstance(prefetch, str):
+            prefetch = Prefetch(prefetch)
+        related_model, related_rows = _follow(model, prefetch.prefetch_through, rows)
+        queryset: QuerySet = prefetch.queryset if prefetch.queryset is not None else related_model.objects.all()
+        nested_queries, nested_objects = _plan_cost(related_model, _selected(queryset.query.select_related),
+                                                    queryset._prefetch_related_lookups, related_rows)
+        queries += nested_queries
+        objects += nested_objects
+    return queries, objects
+
+
+def estimate(serializer_class: Type[ModelSerializer], rows: Optional[int] = None) -> Cost:
+    """
+    Estimate the queries and rows it takes to serialize objects with a generic serializer,
+    from its query plan and the sizes of the tables it reads.
+
+    :param serializer_class: Generic serializer with a 'query_plan' attribute.
+    :param rows: Number of objects to serialize, None for every object of the model.
+    """
+
+    model = serializer_class.Meta.model
+    plan: QueryPlan = serializer_class.query_plan
+    rows = table_rows(model) if rows is None else min(rows, table_rows(model))
+    queries, objects = _plan_cost(model, plan.select_related, plan.prefetch_related, rows)
+    return Cost(queries, round(objects))
+
+
+def _timeout(endpoint: str) -> Optional[int]:
+    return getattr(settings, 'API_STATEMENT_TIMEOUTS', {}).get(endpoint)
+
+
+@contextmanager
+def statement_timeout(endpoint: str, using: str = 'default'):
+    """
+    Cancel PostgreSQL statements running longer than settings.API_STATEMENT_TIMEOUTS allows for the endpoint class.
+    Canceled statements are raised as QueryTimeout, other backends don't limit statements.
+    """
+
+    connection = connections[using]
+    if (timeout := _timeout(endpoint)) is None or connection.vendor != 'postgresql':
+        yield
+        return
+
+    in_transaction = connection.in_atomic_block  # Limited until the transaction ends, rather than for the whole session.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('statement_timeout', %s, %s)", [f"{timeout}ms", in_transaction])
+    try:
+        yield
+    except OperationalError as e:
+        if getattr(e.__cause__, 'pgcode', None) == _QUERY_CANCELED:
+            raise QueryTimeout() from e
+        raise
+    finally:
+        if not in_transaction:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET statement_timeout")
+
+
+def timed(endpoint: str) -> Callable:
+    """ Run a view, or a coroutine view, within the statement_timeout() of its endpoint class. """
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_view(*args, **kwargs):
+                timeout = statement_timeout(endpoint)
+                await sync_to_async(timeout.__enter__)()  # On the thread the ORM runs the view's queries on.
+                try:
+                    response = await func(*args, **kwargs)
+                except BaseException as e:
+                    await sync_to_async(timeout.__exit__)(type(e), e, e.__traceback__)  # Raises QueryTimeout instead, if it was one.
+                    raise
+                await sync_to_async(timeout.__exit__)(None, None, None)
+                return response
+            return async_view
+
+        @wraps(func)
+        def view(*args, **kwargs):
+            with statement_timeout(endpoint):
+                return func(*args, **kwargs)
+        return view
+
+    return decorator
+
+
+def timed_iterator(endpoint: str, iterable: Iterable) -> Iterator:
+    """ Iterate within statement_timeout(), for streamed responses, whose queries run after the view has returned. """
+
+    with statement_timeout(endpoint):
+        yield from iterable
@@ -0,0 +1,283 @@
+""" Materialized documents, the output of generic serializers stored per object and refreshed as the objects are written to """
+
+from itertools import islice
+from collections import defaultdict
+from typing import Type, Iterable, Iterator, Union, Optional, NamedTuple
+from django.db import transaction, router, IntegrityError
+from django.db.models import Model, QuerySet, Prefetch, F
+from rest_framework.relations import RelatedField, ManyRelatedField
+from rest_framework.serializers import ModelSerializer, BaseSerializer, ListSerializer
+
+from .signals import connect_batch_listener
+from .models import DocumentSet, Document, DocumentReference
+from .flat import serialize_list
+from .costs import Cost, table_rows, _relation, _selected
+
+_REFRESH_CHUNK_SIZE = 500  # Objects serialized and stored at a time by refreshes.
+
+
+class _Layout(NamedTuple):
+    """ Shape of a serializer's output, the order of its fields and the objects nested in them. """
+
+    model: Type[Model]
+    names: tuple[str, ...]
+    nested: dict[str, '_Layout']  # Nested serializers, of single objects or lists of them.
+    pk_fields: dict[str, Type[Model]]  # ForeignKeys and related sets serialized as primary keys, or lists of them.
+
+    def models(self) -> set[Type[Model]]:
+        """ Every model whose objects (or primary keys) are serialized. """
+
+        return {self.model, *self.pk_fields.values()}.union(*(nested.models() for nested in self.nested.values()))
+
+
+def _layout(serializer: BaseSerializer) -> _Layout:
+    model = serializer.Meta.model
+    nested, pk_fields = {}, {}
+    for name, field in serializer.fields.items():
+        if isinstance(field, ListSerializer):
+            nested[name] = _layout(field.child)
+        elif isinstance(field, BaseSerializer):
+            nested[name] = _layout(field)
+        elif isinstance(field, (ManyRelatedField, RelatedField)):
+            pk_fields[name] = _relation(model, field.source).related_model
+    return _Layout(model, tuple(serializer.fields), nested, pk_fields)
+
+
+def _label(model: Type[Model]) -> str:
+    return model._meta.concrete_model._meta.label_lower
+
+
+def _items(value: Union[list, dict, None]) -> Iterable[dict]:
+    """ Objects of a nested serializer's output, which is a list of them, a single one or None. """
+
+    if isinstance(value, list):
+        return value
+    return (value,) if value else ()
+
+
+def _references(data: dict, layout: _Layout, found: set[tuple[str, str]]) -> set[tuple[str, str]]:
+    """ Adds the (model label, primary key) of every object nested in the document to found. """
+
+    for name, nested in layout.nested.items():
+        pk_name = nested.model._meta.pk.name
+        for item in _items(data.get(name)):
+            if pk_name in item:
+                found.add((_label(nested.model), str(item[pk_name])))
+            _references(item, nested, found)
+    for name, related_model in layout.pk_fields.items():
+        value = data.get(name)
+        found.update((_label(related_model), str(pk)) for pk in (value if isinstance(value, list) else (value,)) if pk is not None)
+    return found
+
+
+def _ordered(data: dict, layout: _Layout) -> dict:
+    """ jsonb doesn't keep the order of keys, so documents are put back in the order of the serializer's fields. """
+
+    ordered = {}
+    for name in layout.names:
+        if name not in data:
+            continue
+        value = data[name]
+        if value and (nested := layout.nested.get(name)) is not None:
+            value = [_ordered(item, nested) for item in value] if isinstance(value, list) else _ordered(value, nested)
+        ordered[name] = value
+    return ordered
+
+
+def _follow(model: Type[Model], lookup: str) -> tuple[Type[Model], str]:
+    """
+    :param lookup: Lookup of a query plan, which names related sets by their accessor.
+
+    :returns: The model at the end of the lookup, and the lookup filters use for it, which name them by their query name.
+    """
+
+    names = []
+    for name in lookup.split('__'):
+        field = _relation(model, name)
+        names.append(field.name)
+        model = field.related_model
+    return model, '__'.join(names)
+
+
+def _lookups(model: Type[Model], select_related: Iterable[str], prefetch_related: Iterable[Union[str, Prefetch]],
+             prefix: str = '') -> dict[Type[Model], set[str]]:
+    """ Filter lookups from the model to each model its query plan reaches, like {Course: {'enrollments__course'}}. """
+
+    lookups = defaultdict(set)
+    for lookup in select_related:
+        related_model, related_lookup = _follow(model, lookup)
+        lookups[related_model].add(prefix + related_lookup)
+    for prefetch in prefetch_related:
+        if isinstance(prefetch, str):
+            prefetch = Prefetch(prefetch)
+        related_model, related_lookup = _follow(model, prefetch.prefetch_through)
+        lookups[related_model].add(prefix + related_lookup)
+        queryset: QuerySet = prefetch.queryset if prefetch.queryset is not None else related_model.objects.all()
+        nested_lookups = _lookups(related_model, _selected(queryset.query.select_related), queryset._prefetch_related_lookups,
+                                  f"{prefix}{related_lookup}__")
+        for nested_model, nested in nested_lookups.items():
+            lookups[nested_model] |= nested
+    return lookups
+
+
+class Materialization:
+    """
+    The documents of a generic serializer, one per object of its model, kept in the Document table (jsonb on PostgreSQL).
+    Reads fetch the documents of their objects by primary key in a single indexed query,
+    objects without a document yet are serialized as usual, and their documents stored for the reads after them.
+
+    Once a transaction writing to any model the documents depend on commits, the documents holding the written objects
+    (or their primary keys), and those whose object the written ones are now related to, are serialized again.
+    Documents are found through the DocumentReference index, so deletes also refresh the documents of objects which were
+    unlinked from the deleted ones without signals, like by on_delete=SET_NULL.
+    """
+
+    def __init__(self, serializer_class: Type[ModelSerializer], depth: int):
+        """
+        :param serializer_class: Generic serializer with 'query_plan' and 'dependencies' attributes.
+        :param depth: Depth of the serializer, which tells its documents apart from those of other depths.
+        """
+
+        plan = serializer_class.query_plan
+        self.serializer_class = serializer_class
+        self.model: Type[Model] = serializer_class.Meta.model
+        self.depth = depth
+        self.layout = _layout(serializer_class())
+        self.lookups = _lookups(self.model, plan.select_related, plan.prefetch_related)
+        self.referenced = {_label(model) for model in self.layout.models() | serializer_class.dependencies}
+        self._document_set_id: Optional[int] = None
+
+    @property
+    def document_set_id(self) -> int:
+        # Looked up on first use, as the table may not exist yet while URLs are loaded.
+        if self._document_set_id is None:
+            self._document_set_id = DocumentSet.objects.get_or_create(model=self.model._meta.label_lower, depth=self.depth)[0].pk
+        return self._document_set_id
+
+    def _documents(self) -> QuerySet:
+        return Document.objects.filter(document_set_id=self.document_set_id)
+
+    def _serialize(self, keys: list[str]) -> dict[str, dict]:
+        """ Serialize the objects with the primary keys, which no longer exist are left out. """
+
+        pk_field = self.model._meta.pk
+        data = serialize_list(self.serializer_class, self.model.objects.filter(pk__in=[pk_field.to_python(key) for key in keys]))
+        return {str(item[pk_field.name]): item for item in data}
+
+    def _store(self, serialized: dict[str, dict]) -> None:
+        documents = Document.objects.bulk_create([Document(document_set_id=self.document_set_id, object_pk=key, data=data)
+                                                  for key, data in serialized.items()])
+        DocumentReference.objects.bulk_create([DocumentReference(document=document, model=label, object_pk=pk)
+                                               for document in documents
+                                               for label, pk in _references(document.data, self.layout, set())])
+
+    def _fill(self, keys: list[str]) -> dict[str, dict]:
+        """
+        Serialize objects without a document, and store their documents,
+        unless a refresh began in the meantime, which they may have been serialized from before.
+        """
+
+        epoch = DocumentSet.objects.filter(pk=self.document_set_id).values_list('epoch', flat=True).get()
+        serialized = self._serialize(keys)
+        try:
+            with transaction.atomic(using=router.db_for_write(Document)):
+                # Waits for a refresh in progress to commit, as it locks the row while bumping the epoch.
+                if DocumentSet.objects.select_for_update().get(pk=self.document_set_id).epoch == epoch:
+                    stored = set(self._documents().filter(object_pk__in=serialized).values_list('object_pk', flat=True))
+                    self._store({key: data for key, data in serialized.items() if key not in stored})
+        except IntegrityError:  # Another read stored them first.
+            pass
+        return serialized
+
+    def _fetch(self, keys: list[str]) -> dict[str, dict]:
+        found = {key: _ordered(data, self.layout)
+                 for key, data in self._documents().filter(object_pk__in=keys).values_list('object_pk', 'data')}
+        if missing := [key for key in keys if key not in found]:
+            found |= self._fill(missing)
+        return found
+
+    def serialize_list(self, queryset: QuerySet) -> list:
+        """ Like flat.serialize_list(), from the documents of the queryset's objects, in the queryset's order. """
+
+        keys = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+        documents = self._fetch(keys)
+        return [documents[key] for key in keys if key in documents]
+
+    def serialized_chunks(self, queryset: QuerySet, chunk_size: int) -> Iterator[list]:
+        """ Like streaming.serialized_chunks(), from the documents of the queryset's objects. """
+
+        pks = queryset.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+        while keys := [str(pk) for pk in islice(pks, chunk_size)]:
+            documents = self._fetch(keys)
+            yield [documents[key] for key in keys if key in documents]
+
+    def serialize_object(self, pk) -> dict:
+        """ Like flat.serialize_object(), from the document of the object with the primary key. """
+
+        key = str(self.model._meta.pk.to_python(pk))
+        if (document := self._fetch([key]).get(key)) is None:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+        return document
+
+    def cost(self, rows: Optional[int] = None) -> Cost:
+        """ Like costs.estimate(), the documents of a list are read after the primary keys of its page. """
+
+        return Cost(1 if rows == 1 else 2, table_rows(self.model) if rows is None else min(rows, table_rows(self.model)))
+
+    def _stale(self, model: Type[Model], action: str, pks: tuple) -> set[str]:
+        """ Keys of the documents a write affects. """
+
+        label = _label(model)
+        if not pks:  # Unknown rows, documents holding any of them are refreshed.
+            if model is self.model:
+                return set(self._documents().values_list('object_pk', flat=True))
+            return set(self._documents().filter(references__model=label).values_list('object_pk', flat=True))
+
+        keys = [str(pk) for pk in pks]
+        # Documents holding the objects as they were, which finds those of deleted objects too.
+        stale = set(self._documents().filter(references__model=label, references__object_pk__in=keys)
+                    .values_list('object_pk', flat=True))
+        # And those of the objects they are now related to.
+        related = {str(pk) for lookup in self.lookups.get(model, ())
+                   for pk in self.model.objects.filter(**{f"{lookup}__in": pks}).values_list('pk', flat=True)}
+        if related:
+            stale |= set(self._documents().filter(object_pk__in=related).values_list('object_pk', flat=True))
+        if model is self.model:  # Written objects get a document right away, deleted ones lose theirs.
+            stale.update(keys)
+        return stale
+
+    def refresh(self, changes: list[tuple[Type[Model], str, tuple]]) -> None:
+        """ Serialize the documents affected by the writes of a committed transaction again, see signals.BatchListener. """
+
+        changes = [(model, action, pks) for model, action, pks in changes if _label(model) in self.referenced]
+        if not changes:
+            return
+        with transaction.atomic(using=router.db_for_write(Document)):
+            # Locks the row until the refresh commits, so reads holding documents serialized before it don't store them.
+            DocumentSet.objects.filter(pk=self.document_set_id).update(epoch=F('epoch') + 1)
+            stale = sorted(set().union(*(self._stale(model, action, pks) for model, action, pks in changes)))
+            for start in range(0, len(stale), _REFRESH_CHUNK_SIZE):
+                chunk = stale[start:start + _REFRESH_CHUNK_SIZE]
+                self._documents().filter(object_pk__in=chunk).delete()
+                self._store(self._serialize(chunk))
+
+
+_materializations: dict[tuple[Type[Model], int], Materialization] = {}
+
+
+def materialize(serializer_class: Type[ModelSerializer], depth: int) -> Materialization:
+    """ The Materialization of a generic serializer, created (and kept up to date from then on) on first use. """
+
+    key = (serializer_class.Meta.model, depth)
+    if key not in _materializations:
+        _materializations[key] = Materialization(serializer_class, depth)
+    return _materializations[key]
+
+
+def _on_commit(changes: list[tuple[Type[Model], str, tuple]]) -> None:
+    for materialization in list(_materializations.values()):
+        materialization.refresh(changes)
+
+
+# Before the listeners invalidating ETags and cached responses, so reads they trigger get the refreshed documents.
+connect_batch_listener(_on_commit)
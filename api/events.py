@@ -0,0 +1,262 @@
+""" Server-Sent Events of committed changes to generic models, served as a plain ASGI application """
+
+import json
+import asyncio
+from threading import Lock
+from urllib.parse import parse_qs
+from typing import Type, Optional, Iterable
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import get_resolver
+from django.db.models import Model
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .signals import connect_listener
+from .changes import logged_models, changes_since, horizon, head
+
+EVENTS_PATH = '/api/events/'
+_BATCH_INTERVAL = 0.25  # Seconds changes are collected for, before they are read from the change log as a single event.
+_HEARTBEAT_INTERVAL = 15  # Seconds between comments sent on idle connections, so proxies don't close them.
+_MAXIMUM_CHANGES = 1000  # Changes read from the change log per event.
+
+
+class Subscription:
+    """ Changes a single client is interested in, which are read from the change log once any of them is committed. """
+
+    def __init__(self, models: set[str], objects: dict[str, set[str]]):
+        """
+        :param models: Labels of models, every change of which should be sent.
+        :param objects: Primary keys (as strings) of objects to send changes of, by model label.
+        """
+
+        self.models = models
+        self.objects = objects
+        self.ready = asyncio.Event()
+
+    @property
+    def labels(self) -> set[str]:
+        return self.models | self.objects.keys()
+
+    def _wanted(self, label: str, pk) -> bool:
+        return label in self.models or str(pk) in self.objects.get(label, ())
+
+    def add(self, label: str, action: str, pks: Iterable) -> None:
+        """ Wakes the subscription up, if any of the changes was subscribed to. """
+
+        if not self.ready.is_set() and any(self._wanted(label, pk) for pk in pks):
+            self.ready.set()
+
+    def select(self, changes: dict[str, dict[str, list]]) -> dict[str, dict[str, list]]:
+        """ The subscribed changes of changes_since()'s, as {label: {action: [pks]}} without empty actions. """
+
+        selected: dict[str, dict[str, list]] = {}
+        for label, model_changes in changes.items():
+            for action, pks in model_changes.items():
+                if pks := [pk for pk in pks if self._wanted(label, pk)]:
+                    selected.setdefault(label, {})[action] = pks
+        return selected
+
+
+class Broker:
+    """ Hands changes to the subscriptions of this process, from whichever thread they are committed in. """
+
+    def __init__(self):
+        self.subscriptions: set[Subscription] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.backend_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscription: Subscription) -> None:
+        """ Must be called from the event loop serving the subscription. """
+
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        if self.backend_task is None or self.backend_task.done():
+            self.backend_task = self.loop.create_task(get_backend().listen(self))
+        self.subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def deliver(self, label: str, action: str, pks: Iterable) -> None:
+        """ Thread safe, the changes are added to the subscriptions on the event loop. """
+
+        if self.loop is None or self.loop.is_closed():  # Nobody has subscribed in this process.
+            return
+        pks = tuple(pks)
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, label, action, pks)
+        except RuntimeError:  # The loop was closed in the meantime.
+            pass
+
+    def _deliver(self, label: str, action: str, pks: tuple) -> None:
+        for subscription in self.subscriptions:
+            subscription.add(label, action, pks)
+
+
+broker = Broker()
+
+
+class LocalBackend:
+    """ Delivers changes to subscribers in the same process only, enough when a single ASGI process serves everything. """
+
+    def publish(self, label: str, action: str, pks: tuple) -> None:
+        """ Called from the thread which committed the changes. """
+
+        broker.deliver(label, action, pks)
+
+    async def listen(self, broker: Broker) -> None:
+        """ Runs on the event loop of the subscribers, delivering changes published by other processes. """
+
+
+class RedisBackend(LocalBackend):
+    """
+    Publishes changes through Redis, so subscribers of every worker process receive changes committed by any of them.
+    Requires the redis package, and reads settings.API_EVENT_REDIS_URL.
+    """
+
+    channel = 'api-events'
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured("API_EVENT_BACKEND is RedisBackend, which requires the redis package, "
+                                       "install it or use api.events.LocalBackend.") from e
+        self.url = getattr(settings, 'API_EVENT_REDIS_URL', 'redis://localhost:6379/0')
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, label: str, action: str, pks: tuple) -> None:
+        self.client.publish(self.channel, json.dumps([label, action, list(pks)], default=str))
+
+    async def listen(self, broker: Broker) -> None:
+        import redis.asyncio
+        async with redis.asyncio.Redis.from_url(self.url).pubsub() as pubsub:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    broker._deliver(*json.loads(message['data']))
+
+
+_backend: Optional[LocalBackend] = None
+_backend_lock = Lock()
+
+
+def get_backend() -> LocalBackend:
+    """ The backend named by settings.API_EVENT_BACKEND. """
+
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(getattr(settings, 'API_EVENT_BACKEND', 'api.events.LocalBackend'))()
+        return _backend
+
+
+def _on_change(model: Type[Model], action: str, pks: tuple) -> None:
+    label = model._meta.label_lower
+    if pks and label in logged_models():
+        get_backend().publish(label, action, pks)
+
+
+connect_listener(_on_change)
+
+
+def _parse_subscription(query_string: bytes) -> Subscription:
+    """
+    Parse ?subscribe=tasks.todo,tasks.team:3,tasks.team:4 into a subscription,
+    to every change of Todo and to changes of the teams with primary keys 3 and 4.
+    """
+
+    get_resolver().url_patterns  # Models are registered for the change feed by generic_crud(), when the URLconf loads.
+    available = logged_models()
+    models, objects = set(), {}
+    for values in parse_qs(query_string.decode()).get('subscribe', []):
+        for entry in (entry.strip() for entry in values.split(',') if entry.strip()):
+            label, _, pk = entry.partition(':')
+            if label not in available:
+                raise ValueError(f"Changes of '{label}' aren't published.")
+            if pk:
+                objects.setdefault(label, set()).add(pk)
+            else:
+                models.add(label)
+    if not models and not objects:
+        raise ValueError("Subscribe to models or objects, like ?subscribe=tasks.todo,tasks.team:3")
+    return Subscription(models, objects)
+
+
+async def _wait_for_disconnect(receive) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _last_event_id(scope: dict) -> Optional[int]:
+    """ Cursor of the last event a reconnecting client received, sent back by browsers as the Last-Event-ID header. """
+
+    value = dict(scope.get('headers', [])).get(b'last-event-id', b'')
+    return int(value) if value.isdigit() else None
+
+
+def _read_changes(subscription: Subscription, cursor: int) -> tuple[list[tuple[int, dict]], int]:
+    """
+    :returns: The subscribed changes after the cursor, as (cursor, changes) of each event to send.
+        Followed by the cursor to continue from, which moves on even if none of the changes were subscribed to.
+    """
+
+    events, more = [], True
+    while more:
+        changes, cursor, more = changes_since(cursor, subscription.labels, _MAXIMUM_CHANGES)
+        if selected := subscription.select(changes):
+            events.append((cursor, selected))
+    return events, cursor
+
+
+async def events_application(scope: dict, receive, send) -> None:
+    """
+    ASGI application streaming the changes subscribed to, as 'changes' events of {label: {action: [pks]}}
+    Events are read from the change log, their ids are its cursors. Clients reconnecting with a Last-Event-ID
+    are sent the changes they missed, or a 'pruned' event when they are no longer logged, after which they should refetch.
+    """
+
+    try:
+        subscription = _parse_subscription(scope.get('query_string', b''))
+    except ValueError as e:
+        await send({'type': 'http.response.start', 'status': 400, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps({'detail': str(e)}).encode()})
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+    broker.subscribe(subscription)  # Before reading the cursor, so no change committed after it is missed.
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        cursor = _last_event_id(scope)
+        if cursor is not None and cursor < await sync_to_async(horizon)():
+            cursor = await sync_to_async(head)()
+            await send({'type': 'http.response.body', 'body': f"id: {cursor}\nevent: pruned\ndata: {{}}\n\n".encode(),
+                        'more_body': True})
+        elif cursor is None:
+            cursor = await sync_to_async(head)()
+        else:
+            subscription.ready.set()  # Replays what was missed while disconnected.
+
+        while not disconnected.done():
+            ready = asyncio.ensure_future(subscription.ready.wait())
+            await asyncio.wait({ready, disconnected}, timeout=_HEARTBEAT_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            ready.cancel()
+            if disconnected.done():
+                break
+            if not subscription.ready.is_set():
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+                continue
+
+            await asyncio.sleep(_BATCH_INTERVAL)  # Changes arriving meanwhile are coalesced into the same event.
+            subscription.ready.clear()
+            events, cursor = await sync_to_async(_read_changes)(subscription, cursor)
+            for event_id, changes in events:
+                data = json.dumps(changes, default=str)
+                await send({'type': 'http.response.body', 'body': f"id: {event_id}\nevent: changes\ndata: {data}\n\n".encode(),
+                            'more_body': True})
+    finally:
+        broker.unsubscribe(subscription)
+        disconnected.cancel()
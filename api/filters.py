@@ -0,0 +1,113 @@
+""" Field lookups and ordering from query parameters, for generic list views """
+
+from typing import Type, Iterable
+from django.db.models import Model, QuerySet, Field, BooleanField
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework.request import Request
+from rest_framework.exceptions import ValidationError
+
+# Query parameters used by the generic views themselves, rather than filtering on a field, even if a field is named alike.
+RESERVED_PARAMS = {'depth', 'fields', 'expand', 'after', 'offset', 'limit', 'format', 'ordering', 'group_by', 'aggregate',
+                   'on_conflict'}
+
+_LOOKUPS = {'exact', 'in', 'range', 'isnull', 'gt', 'gte', 'lt', 'lte'}
+
+
+def indexed_fields(model: Type[Model]) -> set[str]:
+    """ Names of the fields which lead an index, so filtering or ordering on them doesn't require a full scan. """
+
+    names = {field.name for field in model._meta.concrete_fields if field.primary_key or field.unique or field.db_index}
+    names |= {index.fields[0].lstrip('-') for index in model._meta.indexes if index.fields}
+    names |= {fields[0] for fields in (*model._meta.unique_together, *model._meta.index_together) if fields}
+    names |= {constraint.fields[0] for constraint in model._meta.constraints if getattr(constraint, 'fields', None)}
+    return names
+
+
+def _names_field(model: Type[Model], name: str) -> bool:
+    try:
+        return name == 'pk' or model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+def _get_field(model: Type[Model], name: str, param: str, allowed: set[str]) -> Field:
+    try:
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = None
+    if field is None or not field.concrete:
+        raise ValidationError({param: [f"{model.__name__} has no field '{name}' to filter or order by."]})
+    if field.name not in allowed:
+        raise ValidationError({param: [f"{model.__name__}.{name} is not indexed, so it can't be used to filter or order by."]})
+    return field
+
+
+def _to_python(field: Field, value: str, param: str):
+    if isinstance(field, BooleanField) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'  # Django only accepts 'True' and 'False', but JSON clients send lowercase.
+    try:
+        return field.to_python(value)
+    except DjangoValidationError as e:
+        raise ValidationError({param: e.messages})
+
+
+def filter_queryset(request: Request, queryset: QuerySet, unindexed: Iterable[str] = ()) -> QuerySet:
+    """
+    Filter the queryset by every non-reserved query parameter naming a field, like ?complete=false&task=12 or
+    ?grade__range=4,10. Supported lookups are exact, in, range, isnull, gt, gte, lt and lte. List values are comma separated.
+    Other parameters, like a cache buster, are ignored.
+
+    :param request: Request holding the filters.
+    :param queryset: Queryset to filter.
+    :param unindexed: Fields which may be filtered on, even though no index leads with them.
+
+    :returns: The filtered queryset.
+    """
+
+    model = queryset.model
+    allowed = indexed_fields(model) | set(unindexed)
+    lookups = {}
+    for param, value in request.GET.items():
+        if param in RESERVED_PARAMS:
+            continue
+        name, _, lookup = param.partition('__')
+        if not _names_field(model, name):
+            continue
+        lookup = lookup or 'exact'
+        if lookup not in _LOOKUPS:
+            raise ValidationError({param: [f"Unsupported lookup '{lookup}', use one of: {', '.join(sorted(_LOOKUPS))}."]})
+        field = _get_field(model, name, param, allowed)
+
+        if lookup == 'isnull':
+            if value.lower() not in ('true', 'false', '1', '0'):
+                raise ValidationError({param: ["Expected true or false."]})
+            lookups[param] = value.lower() in ('true', '1')
+        elif lookup in ('in', 'range'):
+            values = [_to_python(field, item, param) for item in value.split(',') if item != '']
+            if lookup == 'range' and len(values) != 2:
+                raise ValidationError({param: ["Expected two comma separated values."]})
+            lookups[param] = values
+        else:
+            lookups[param] = _to_python(field, value, param)
+
+    return queryset.filter(**lookups) if lookups else queryset
+
+
+def order_queryset(request: Request, queryset: QuerySet, unindexed: Iterable[str] = ()) -> QuerySet:
+    """
+    Order the queryset by ?ordering=, a comma separated list of field names, prefixed with '-' to order descending.
+    The primary key is always added as the last column, so pages of the result are stable.
+    """
+
+    if not (param := request.GET.get('ordering')):
+        return queryset
+
+    model = queryset.model
+    allowed = indexed_fields(model) | set(unindexed)
+    ordering = []
+    for name in (name.strip() for name in param.split(',') if name.strip()):
+        _get_field(model, name.lstrip('-'), 'ordering', allowed)
+        ordering.append(name)
+    if not {'pk', '-pk', model._meta.pk.name, f"-{model._meta.pk.name}"} & set(ordering):
+        ordering.append('pk')
+    return queryset.order_by(*ordering)
@@ -0,0 +1,151 @@
+""" Serializer-free encoding of flat generic serializers, straight from values_list() rows """
+
+from weakref import WeakKeyDictionary
+from collections import defaultdict
+from typing import Type, Callable, Optional, NamedTuple
+from django.db.models import Model, QuerySet, ForeignKey, ManyToOneRel, ManyToManyRel
+from rest_framework import fields as drf_fields
+from rest_framework.relations import PrimaryKeyRelatedField, ManyRelatedField
+from rest_framework.serializers import ModelSerializer
+
+# DRF fields whose to_representation() returns values from the database as they are.
+_IDENTITY_FIELDS = (drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField, drf_fields.FloatField)
+
+
+class RelatedSet(NamedTuple):
+    """ A related set serialized as a list of primary keys. """
+
+    model: Type[Model]  # Model of the related objects.
+    lookup: str  # Field of the related model pointing back to the serialized model.
+
+
+class FlatEncoder(NamedTuple):
+    """
+    Serializes objects from values_list() rows, like a generic serializer without nested serializers would.
+    Each field is converted with a converter precomputed from the serializer's own fields, so the output is identical.
+    """
+
+    names: tuple[str, ...]  # Serialized field names, in order.
+    columns: tuple[str, ...]  # values_list() columns of the concrete fields, followed by the primary key.
+    converters: tuple[Optional[Callable], ...]  # Per concrete field, None when the value is serialized as it is.
+    related_sets: tuple[RelatedSet, ...]  # Serialized after the concrete fields, like generic serializers do.
+
+    def rows(self, queryset: QuerySet) -> QuerySet:
+        """ The lazy values_list() of the concrete fields, the primary key is the last column. """
+
+        return queryset.values_list(*self.columns)
+
+    def related_querysets(self, pks: list) -> list[QuerySet]:
+        """ One lazy values_list() of (parent pk, related pk) per related set, in the order of related_sets. """
+
+        return [related_set.model.objects.filter(**{f"{related_set.lookup}__in": pks}).values_list(related_set.lookup, 'pk')
+                for related_set in self.related_sets]
+
+    def encode(self, rows: list[tuple], related_rows: list[list[tuple]] = ()) -> list[dict]:
+        """
+        :param rows: Rows of rows().
+        :param related_rows: Rows of related_querysets(), for the primary keys of the rows.
+
+        :returns: The serialized objects.
+        """
+
+        grouped = []
+        for rows_of_set in related_rows:
+            pks_by_parent = defaultdict(list)
+            for parent, pk in rows_of_set:
+                pks_by_parent[parent].append(pk)
+            grouped.append(pks_by_parent)
+
+        converted = [(index, converter) for index, converter in enumerate(self.converters) if converter is not None]
+        objects = []
+        for row in rows:
+            values = list(row[:-1])
+            for index, converter in converted:
+                if values[index] is not None:  # Like DRF, None is never passed to to_representation().
+                    values[index] = converter(values[index])
+            values += [pks_by_parent.get(row[-1], []) for pks_by_parent in grouped]
+            objects.append(dict(zip(self.names, values)))
+        return objects
+
+    def fetch_and_encode(self, rows: list[tuple]) -> list[dict]:
+        """ encode(), fetching the related sets of the rows first. """
+
+        if not rows:
+            return []
+        return self.encode(rows, [list(related) for related in self.related_querysets([row[-1] for row in rows])])
+
+
+_encoders: WeakKeyDictionary[Type[ModelSerializer], Optional[FlatEncoder]] = WeakKeyDictionary()
+
+
+def flat_encoder(serializer_class: Type[ModelSerializer]) -> Optional[FlatEncoder]:
+    """
+    :param serializer_class: Generic or shaped serializer class.
+
+    :returns: The serializer's FlatEncoder, or None if the serializer nests objects (or has fields it can't encode).
+    """
+
+    try:
+        return _encoders[serializer_class]
+    except KeyError:
+        encoder = _encoders[serializer_class] = _build_encoder(serializer_class)
+        return encoder
+
+
+def _build_encoder(serializer_class: Type[ModelSerializer]) -> Optional[FlatEncoder]:
+    if serializer_class._declared_fields:  # Nested serializers
+        return None
+
+    model = serializer_class.Meta.model
+    concrete: list[tuple[str, str, Optional[Callable]]] = []
+    related: list[tuple[str, Type[Model], str]] = []
+    for name, field in serializer_class().fields.items():
+        model_field = model._meta.get_field(name)
+        if field.source != name:
+            return None
+        if isinstance(field, ManyRelatedField) and isinstance(model_field, (ManyToOneRel, ManyToManyRel)):
+            if isinstance(model_field, ManyToOneRel) and model_field.field_name != model._meta.pk.name:
+                return None  # The related objects point to another unique field of ours.
+            related.append((name, model_field.related_model, model_field.field.name))
+            continue
+        if related:  # Rows hold the concrete fields first, generic serializers always put related sets last.
+            return None
+        if isinstance(field, PrimaryKeyRelatedField) and isinstance(model_field, ForeignKey):
+            if model_field.target_field != model_field.related_model._meta.pk:
+                return None
+            converter = field.pk_field.to_representation if field.pk_field is not None else None
+        elif model_field.concrete and not model_field.is_relation:
+            converter = None if isinstance(field, _IDENTITY_FIELDS) else field.to_representation
+        else:
+            return None
+        concrete.append((name, model_field.attname, converter))
+
+    return FlatEncoder(
+        names=(*(name for name, _, _ in concrete), *(name for name, _, _ in related)),
+        columns=(*(column for _, column, _ in concrete), 'pk'),
+        converters=tuple(converter for _, _, converter in concrete),
+        related_sets=tuple(RelatedSet(related_model, lookup) for _, related_model, lookup in related),
+    )
+
+
+def serialize_list(serializer_class: Type[ModelSerializer], queryset: QuerySet) -> list:
+    """
+    Serialize a queryset, through the serializer's FlatEncoder when it has one, otherwise through its query plan.
+
+    :param serializer_class: Generic or shaped serializer class.
+    :param queryset: Objects to serialize, without the serializer's query plan applied.
+
+    :returns: The serialized objects.
+    """
+
+    if (encoder := flat_encoder(serializer_class)) is None:
+        return serializer_class(serializer_class.query_plan.apply(queryset), many=True).data
+    return encoder.fetch_and_encode(list(encoder.rows(queryset)))
+
+
+def serialize_object(serializer_class: Type[ModelSerializer], queryset: QuerySet, **lookup) -> dict:
+    """ Like serialize_list(), for the single object matching the lookup. """
+
+    if (encoder := flat_encoder(serializer_class)) is None:
+        return serializer_class(serializer_class.query_plan.apply(queryset).get(**lookup)).data
+    return encoder.fetch_and_encode([encoder.rows(queryset).get(**lookup)])[0]
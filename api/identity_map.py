@@ -0,0 +1,157 @@
+""" Request-scoped identity map, so objects looked up by primary key are only queried once per request """
+
+import asyncio
+from contextvars import ContextVar
+from collections import defaultdict
+from typing import Type, Optional, Iterable, Callable
+from django.db.models import Model, QuerySet
+from django.db.models.query import ModelIterable
+from django.http import HttpRequest, HttpResponseBase
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.decorators import sync_and_async_middleware
+
+from .signals import connect_write_listener, is_tracked
+
+IDENTITY_MAP_HEADER = 'X-Identity-Map'
+
+
+class IdentityMap:
+    """ Objects fetched during a single request, by model and primary key. """
+
+    def __init__(self):
+        self.objects: dict[Type[Model], dict[object, Model]] = defaultdict(dict)
+        self.saved = 0  # Lookups answered without a query.
+        self.queried = 0  # Lookups which had to query.
+
+    def discard(self, model: Type[Model], pks: tuple) -> None:
+        """ Forget written objects, or every object of the model when the primary keys aren't known. """
+
+        for cached_model in list(self.objects):
+            if cached_model._meta.concrete_model is not model._meta.concrete_model:
+                continue
+            if not pks:
+                del self.objects[cached_model]
+                continue
+            for pk in pks:
+                self.objects[cached_model].pop(pk, None)
+
+
+_current: ContextVar[Optional[IdentityMap]] = ContextVar('api_identity_map', default=None)
+
+
+def as_pk(model: Type[Model], value) -> Optional[object]:
+    """ Normalize a primary key from a payload or form, so it matches the keys of fetched objects. """
+
+    if value is None or isinstance(value, (bool, dict, list)):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (DjangoValidationError, TypeError):
+        return None
+
+
+def _whole_objects(queryset: QuerySet) -> bool:
+    """ Whether the queryset fetches complete objects, which the identity map may keep. """
+
+    query = queryset.query
+    return queryset._iterable_class is ModelIterable and not query.annotations and not query.extra \
+        and query.deferred_loading == (frozenset(), True) and query.combinator is None
+
+
+def _servable(queryset: QuerySet) -> bool:
+    """ Whether the queryset is a plain one of every object, which the objects in the identity map can stand in for. """
+
+    query = queryset.query
+    return _whole_objects(queryset) and not query.where and not query.is_sliced and not query.distinct \
+        and not query.select_related and not queryset._prefetch_related_lookups
+
+
+def _active(queryset: QuerySet) -> Optional[IdentityMap]:
+    # Only writes to tracked models are known of, so only their objects can be kept.
+    identity_map = _current.get()
+    return identity_map if identity_map is not None and is_tracked(queryset.model) else None
+
+
+def lookup(queryset: QuerySet, pk) -> Optional[Model]:
+    """ The object with the primary key, when it was fetched earlier in the request, and the queryset would return it as is. """
+
+    if (identity_map := _active(queryset)) is None or not _servable(queryset):
+        return None
+    instance = identity_map.objects.get(queryset.model, {}).get(as_pk(queryset.model, pk))
+    if instance is not None:
+        identity_map.saved += 1
+    return instance
+
+
+def remember(queryset: QuerySet, instances: Iterable[Model]) -> None:
+    """ Keep objects which were just fetched with the queryset, for the rest of the request. """
+
+    if (identity_map := _active(queryset)) is None:
+        return
+    identity_map.queried += 1
+    if _whole_objects(queryset):
+        objects = identity_map.objects[queryset.model]
+        for instance in instances:
+            objects[instance.pk] = instance
+
+
+def in_bulk(queryset: QuerySet, pks: Iterable) -> dict[object, Model]:
+    """ Like queryset.in_bulk(pks), but objects fetched earlier in the request aren't queried again. """
+
+    if _active(queryset) is None:
+        return queryset.in_bulk(pks)
+
+    model = queryset.model
+    pks = {pk for pk in (as_pk(model, pk) for pk in pks) if pk is not None}
+    found = {}
+    if _servable(queryset):
+        objects = _current.get().objects.get(model, {})
+        found = {pk: objects[pk] for pk in pks if pk in objects}
+    if missing := pks - found.keys():
+        fetched = queryset.in_bulk(missing)
+        remember(queryset, fetched.values())
+        found |= fetched
+    elif pks:
+        _current.get().saved += 1
+    return found
+
+
+def _on_write(model: Type[Model], action: str, pks: tuple) -> None:
+    if (identity_map := _current.get()) is not None:
+        identity_map.discard(model, pks)
+
+
+connect_write_listener(_on_write)
+
+
+def _report(identity_map: IdentityMap, response: HttpResponseBase) -> HttpResponseBase:
+    if identity_map.saved or identity_map.queried:
+        response[IDENTITY_MAP_HEADER] = f"saved={identity_map.saved}, queried={identity_map.queried}"
+    return response
+
+
+@sync_and_async_middleware
+def identity_map_middleware(get_response: Callable) -> Callable:
+    """
+    Give each request its own identity map, which lookup(), remember() and in_bulk() use while it is being handled.
+    The number of lookups it answered without a query is reported in the X-Identity-Map header.
+    """
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request: HttpRequest) -> HttpResponseBase:
+            token = _current.set(identity_map := IdentityMap())
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return _report(identity_map, response)
+        return middleware
+
+    def middleware(request: HttpRequest) -> HttpResponseBase:
+        token = _current.set(identity_map := IdentityMap())
+        try:
+            response = get_response(request)
+        finally:
+            _current.reset(token)
+        return _report(identity_map, response)
+    return middleware
@@ -0,0 +1,192 @@
+""" Streamed bulk import of CSV and NDJSON, merged through a PostgreSQL COPY staging table, or batched bulk_create() elsewhere """
+
+import csv
+import json
+import codecs
+from io import StringIO
+from typing import Type, Iterator
+from django.db import connections, router
+from django.db.models import Model, Field
+from django.http import HttpRequest
+from rest_framework.exceptions import ValidationError, UnsupportedMediaType
+from rest_framework.serializers import ModelSerializer
+
+from .signals import CREATED, UPDATED, notify_changed
+from .upserts import UNCHANGED, ERROR, conflict_fields, insert_columns, without_unique_validators, conflict_clause, key_of, \
+    upsert, insert_returning
+
+
+def parse_rows(request: HttpRequest) -> Iterator[dict]:
+    """
+    Read objects from a text/csv (with a header row) or application/x-ndjson body, one line at a time.
+    Empty CSV cells are left out, so the model's defaults apply to them.
+    """
+
+    lines = codecs.iterdecode(request, 'utf-8')
+    if request.content_type == 'text/csv':
+        for row in csv.DictReader(lines):
+            yield {name: value for name, value in row.items() if name is not None and value != ''}
+    elif request.content_type == 'application/x-ndjson':
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = None
+            if not isinstance(item, dict):
+                raise ValidationError({'non_field_errors': [f"Line {number} is not a JSON object."]})
+            yield item
+    else:
+        raise UnsupportedMediaType(request.content_type)
+
+
+def validate_rows(serializer_class: Type[ModelSerializer], rows: list[dict], offset: int) -> list[Model]:
+    """
+    Validate a chunk of rows, without the uniqueness validators, which would query once per row.
+    Conflicts with existing objects are handled by the importer instead.
+
+    :param offset: Index of the first row in the import, errors are reported by the index of their row.
+
+    :returns: Unsaved instances of the rows.
+    """
+
+    serializer = without_unique_validators(serializer_class(data=rows, many=True))
+    if not serializer.is_valid():
+        raise ValidationError({offset + index: errors for index, errors in enumerate(serializer.errors) if errors})
+    return [serializer_class.Meta.model(**data) for data in serializer.validated_data]
+
+
+class BulkCreateImporter:
+    """ Writes each chunk with bulk_create(), or upsert() when rows may identify existing objects. """
+
+    def __init__(self, model: Type[Model], on_conflict: str, batch_size: int):
+        self.model = model
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.key_fields = conflict_fields(model) if on_conflict != ERROR else ()
+        self.columns = insert_columns(model)
+        self.received = self.created = self.updated = 0
+
+    def load(self, instances: list[Model]) -> None:
+        """ Write a chunk of validated rows. """
+
+        self.received += len(instances)
+        if not self.key_fields:
+            self._create(instances)
+            return
+
+        by_key = {key_of(instance, self.key_fields): instance for instance in instances}  # Later rows replace earlier ones.
+        outcome = upsert(self.model, list(by_key.values()), self.on_conflict, self.batch_size)
+        self.created += len(outcome[CREATED])
+        self.updated += len(outcome[UPDATED])
+
+    def _create(self, instances: list[Model]) -> None:
+        if instances:
+            created = self.model._base_manager.bulk_create(instances, batch_size=self.batch_size)
+            notify_changed(self.model, CREATED, [instance.pk for instance in created])  # bulk_create() doesn't send post_save.
+            self.created += len(created)
+
+    def finish(self) -> dict[str, int]:
+        """ :returns: The number of rows which created, updated and didn't change an object. """
+
+        return {CREATED: self.created, UPDATED: self.updated, UNCHANGED: self.received - self.created - self.updated}
+
+
+class CopyImporter(BulkCreateImporter):
+    """
+    Streams each chunk into a temporary staging table with COPY, which is merged into the model's table in a single
+    INSERT ... SELECT ... ON CONFLICT once every row is loaded. Rows which wouldn't change an object aren't written.
+    Must be used within a transaction, which drops the staging table.
+    """
+
+    _ROW_COLUMN = 'api_import_row'  # Order of the rows in the staging table, so later rows win.
+
+    # Types of the fields whose database values are written in COPY's text format by str(), by Field.get_internal_type().
+    _TEXT_TYPES = {'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+                   'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField', 'BooleanField',
+                   'CharField', 'TextField', 'SlugField', 'FileField', 'FilePathField', 'DateField', 'DateTimeField',
+                   'TimeField', 'DecimalField', 'FloatField', 'UUIDField', 'GenericIPAddressField'}
+    _FORMATTED_TYPES = {'JSONField', 'BinaryField'}  # Formatted by _csv_value() from their Python values instead.
+
+    def __init__(self, model: Type[Model], on_conflict: str, batch_size: int):
+        super().__init__(model, on_conflict, batch_size)
+        self.connection = connections[router.db_for_write(model)]
+        quote = self.connection.ops.quote_name
+        self.table = quote(model._meta.db_table)
+        self.staging = quote(f"api_import_{model._meta.db_table}")
+        self.column_names = ', '.join(quote(field.column) for field in self.columns)
+        self.staged = False
+
+    @staticmethod
+    def _internal_type(field: Field) -> str:
+        return (field.target_field if field.is_relation else field).get_internal_type()
+
+    @classmethod
+    def supports(cls, model: Type[Model]) -> bool:
+        """ Whether every column of the model can be written by COPY, array and range fields for instance can't. """
+
+        return all(cls._internal_type(field) in cls._TEXT_TYPES | cls._FORMATTED_TYPES for field in insert_columns(model))
+
+    def _csv_value(self, field: Field, instance: Model) -> str:
+        """ Quoted, unless NULL, which COPY tells apart from empty strings by the missing quotes. """
+
+        value = field.pre_save(instance, True)
+        internal_type = self._internal_type(field)
+        if value is not None and internal_type == 'JSONField':
+            value = json.dumps(value, cls=field.encoder)
+        elif value is not None and internal_type == 'BinaryField':
+            value = '\\x' + bytes(value).hex()  # bytea's hex format.
+        else:
+            value = field.get_db_prep_save(value, self.connection)
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def load(self, instances: list[Model]) -> None:
+        self.received += len(instances)
+        with self.connection.cursor() as cursor:
+            if not self.staged:
+                cursor.execute(f"CREATE TEMPORARY TABLE {self.staging} ON COMMIT DROP AS "
+                               f"SELECT {self.column_names} FROM {self.table} WITH NO DATA")
+                cursor.execute(f"ALTER TABLE {self.staging} ADD COLUMN {self._ROW_COLUMN} bigserial")
+                self.staged = True
+
+            buffer = StringIO()
+            for instance in instances:
+                buffer.write(','.join(self._csv_value(field, instance) for field in self.columns) + '\n')
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {self.staging} ({self.column_names}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def finish(self) -> dict[str, int]:
+        if not self.staged:
+            return super().finish()
+
+        quote = self.connection.ops.quote_name
+        source = f"SELECT {self.column_names} FROM {self.staging} ORDER BY {self._ROW_COLUMN}"
+        conflict = ''
+        if self.key_fields:
+            key_columns = ', '.join(quote(field.column) for field in self.key_fields)
+            # A row may only be merged once per statement, so only the last row of each key is merged.
+            source = f"SELECT DISTINCT ON ({key_columns}) {self.column_names} FROM {self.staging} " \
+                     f"ORDER BY {key_columns}, {self._ROW_COLUMN} DESC"
+            conflict = conflict_clause(self.model, self.on_conflict)
+
+        for created, updated in insert_returning(self.model, source, None, conflict, self.batch_size):
+            if created:
+                notify_changed(self.model, CREATED, [pk for pk, in created])
+            if updated:
+                notify_changed(self.model, UPDATED, [pk for pk, in updated])
+            self.created += len(created)
+            self.updated += len(updated)
+        return super().finish()
+
+
+def importer(model: Type[Model], on_conflict: str, batch_size: int) -> BulkCreateImporter:
+    """ A CopyImporter on PostgreSQL, unless the model has fields COPY can't write, a BulkCreateImporter elsewhere. """
+
+    if connections[router.db_for_write(model)].vendor == 'postgresql' and CopyImporter.supports(model):
+        return CopyImporter(model, on_conflict, batch_size)
+    return BulkCreateImporter(model, on_conflict, batch_size)
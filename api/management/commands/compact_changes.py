@@ -0,0 +1,18 @@
+""" Compacts and prunes the change log behind /api/changes/, run it periodically (e.g. hourly from cron) """
+
+from django.core.management.base import BaseCommand
+
+from api.changes import compact_changes, prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Keep only the newest change of each object in the change log, and remove changes older than the retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention', type=int, default=None,
+                            help='Seconds to keep changes for, settings.API_CHANGE_LOG_RETENTION by default.')
+
+    def handle(self, *args, retention=None, **options):
+        compacted = compact_changes()
+        pruned = prune_changes(retention)
+        self.stdout.write(f"Compacted {compacted} and pruned {pruned} changes.")
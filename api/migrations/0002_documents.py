@@ -0,0 +1,57 @@
+# Generated by Django 4.1.2 on 2026-10-18 05:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('data', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DocumentSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=128)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('epoch', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model', 'depth')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentReference',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=128)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='api.document')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='document_set',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='api.documentset'),
+        ),
+        migrations.AddIndex(
+            model_name='documentreference',
+            index=models.Index(fields=['model', 'object_pk'], name='api_documen_model_4be2d5_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='document',
+            unique_together={('document_set', 'object_pk')},
+        ),
+    ]
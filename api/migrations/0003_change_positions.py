@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+def sequence_logged(apps, schema_editor):
+    # Cursors handed out so far were ids, which stay valid as the positions of the changes logged before.
+    Change = apps.get_model('api', 'Change')
+    Change.objects.using(schema_editor.connection.alias).update(position=models.F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='position',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(sequence_logged, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(condition=models.Q(('position__isnull', True)), fields=['id'], name='api_change_unsequenced'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(condition=models.Q(('action', 'pruned')), fields=['position'], name='api_change_pruned'),
+        ),
+    ]
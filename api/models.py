@@ -1,3 +1,71 @@
-from django.db import models
+from django.db.models import Model, BigAutoField, BigIntegerField, PositiveSmallIntegerField, CharField, DateTimeField, \
+    JSONField, ForeignKey, Index, Q, CASCADE
+from rest_framework.utils.encoders import JSONEncoder
 
-# Create your models here.
\ No newline at end of file
+from .signals import CREATED, UPDATED, DELETED
+
+PRUNED = 'pruned'
+
+
+class Change(Model):
+    """ Append-only log of committed writes to models exposed through generic_crud(), read through /api/changes/. """
+
+    ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted'),
+               (PRUNED, 'Pruned')]  # Marks the newest change removed by retention, older cursors can't be served.
+
+    id = BigAutoField(primary_key=True)
+    # Cursor of the change feed, given once the change is committed, after every change committed before it, see api.changes.
+    position = BigIntegerField(null=True, unique=True)
+    model = CharField(max_length=128)  # Model label, like tasks.todo
+    object_pk = CharField(max_length=64)
+    action = CharField(max_length=8, choices=ACTIONS)
+    created_at = DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [Index(fields=['model', 'object_pk']),
+                   Index(fields=['id'], condition=Q(position__isnull=True), name='api_change_unsequenced'),
+                   Index(fields=['position'], condition=Q(action=PRUNED), name='api_change_pruned')]
+
+    def __str__(self):
+        return f"{self.action} {self.model} {self.object_pk}"
+
+
+class DocumentSet(Model):
+    """ The documents of a model materialized at one depth, see api.documents. """
+
+    model = CharField(max_length=128)  # Model label, like tasks.team
+    depth = PositiveSmallIntegerField()
+    epoch = BigIntegerField(default=0)  # Bumped by every refresh, so documents serialized before it aren't stored.
+
+    class Meta:
+        unique_together = [('model', 'depth')]
+
+    def __str__(self):
+        return f"{self.model} at depth {self.depth}"
+
+
+class Document(Model):
+    """ Output of a generic serializer for a single object, stored so reads don't have to serialize it again. """
+
+    id = BigAutoField(primary_key=True)
+    document_set = ForeignKey(DocumentSet, on_delete=CASCADE, related_name='documents')
+    object_pk = CharField(max_length=64)
+    data = JSONField(encoder=JSONEncoder)  # jsonb on PostgreSQL, encoded like DRF renders it.
+
+    class Meta:
+        unique_together = [('document_set', 'object_pk')]
+
+    def __str__(self):
+        return f"{self.document_set} {self.object_pk}"
+
+
+class DocumentReference(Model):
+    """ An object serialized into a document, so the document is refreshed when the object is written to. """
+
+    id = BigAutoField(primary_key=True)
+    document = ForeignKey(Document, on_delete=CASCADE, related_name='references')
+    model = CharField(max_length=128)
+    object_pk = CharField(max_length=64)
+
+    class Meta:
+        indexes = [Index(fields=['model', 'object_pk'])]
@@ -0,0 +1,150 @@
+""" Pagination and total-count helpers for the generic web API """
+
+import json
+from enum import Enum
+from typing import Type
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Model, QuerySet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.request import Request
+from rest_framework.exceptions import ValidationError
+
+_DEFAULT_PAGE_SIZE = 100
+_MAXIMUM_PAGE_SIZE = 1000
+assert _DEFAULT_PAGE_SIZE <= _MAXIMUM_PAGE_SIZE
+
+TOTAL_COUNT_HEADER = 'X-Total-Count'
+TOTAL_COUNT_TYPE_HEADER = 'X-Total-Count-Type'
+NEXT_CURSOR_HEADER = 'X-Next-After'
+
+
+class Pagination(Enum):
+    NONE = 0
+    KEYSET = 1  # ?after=<pk>&limit=<n>, stable under concurrent inserts.
+    OFFSET = 2  # ?offset=<n>&limit=<n>
+
+
+class TotalCount(Enum):
+    NONE = 0
+    EXACT = 1  # SELECT COUNT(*)
+    ESTIMATED = 2  # PostgreSQL planner statistics, falls back to EXACT on other backends.
+
+
+def _get_limit(request: Request, page_size: int) -> int:
+    """ Read ?limit= from the request, clamped like ?depth= is. """
+
+    try:
+        limit = int(request.GET.get('limit', page_size))
+    except ValueError:
+        limit = page_size
+    return max(1, min(limit, _MAXIMUM_PAGE_SIZE))
+
+
+def _link(request: Request, rel: str, **params) -> str:
+    """ Create a Link header entry pointing to the current URL with some query parameters replaced. """
+
+    query = request.GET.copy()
+    for key, value in params.items():
+        query[key] = str(value)
+    return f'<{request.build_absolute_uri(request.path)}?{query.urlencode()}>; rel="{rel}"'
+
+
+def paginate(request: Request, queryset: QuerySet, pagination: Pagination, page_size: int = _DEFAULT_PAGE_SIZE) -> tuple[QuerySet, dict[str, str]]:
+    """
+    Restrict the queryset to the page requested by the client.
+
+    :param request: Request containing ?after=, ?offset= and ?limit= parameters.
+    :param queryset: Unpaginated queryset to slice.
+    :param pagination: Pagination mode of the endpoint.
+    :param page_size: Number of objects returned when the client doesn't specify ?limit=.
+
+    :returns: The (lazy) queryset of the page, and the headers describing how to get the next one.
+    """
+
+    if pagination is Pagination.NONE:
+        return queryset, {}
+
+    model: Type[Model] = queryset.model
+    limit = _get_limit(request, page_size)
+    headers: dict[str, str] = {}
+
+    if pagination is Pagination.KEYSET:
+        queryset = queryset.order_by('pk')
+        if 'after' in request.GET:
+            try:
+                after = model._meta.pk.to_python(request.GET['after'])
+            except DjangoValidationError as e:
+                raise ValidationError({'after': e.messages})
+            queryset = queryset.filter(pk__gt=after)
+
+        # Look ahead using only the primary key index, so the page itself stays lazy.
+        boundary = list(queryset.values_list('pk', flat=True)[limit - 1:limit + 1])
+        if len(boundary) > 1:
+            headers[NEXT_CURSOR_HEADER] = str(boundary[0])
+            headers['Link'] = _link(request, 'next', after=boundary[0], limit=limit)
+        return queryset[:limit], headers
+
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+    except ValueError:
+        raise ValidationError({'offset': ['A non-negative integer is required.']})
+
+    if not queryset.ordered:  # Slicing an unordered queryset doesn't give stable pages.
+        queryset = queryset.order_by('pk')
+
+    links = []
+    if queryset[offset + limit:offset + limit + 1].exists():
+        links.append(_link(request, 'next', offset=offset + limit, limit=limit))
+    if offset > 0:
+        links.append(_link(request, 'prev', offset=max(0, offset - limit), limit=limit))
+    if links:
+        headers['Link'] = ', '.join(links)
+    return queryset[offset:offset + limit], headers
+
+
+def estimated_count(queryset: QuerySet) -> int:
+    """
+    Estimate the number of rows in the queryset from the PostgreSQL planner, without scanning the table.
+    The estimate is only as fresh as the latest ANALYZE of the table.
+    """
+
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):  # Depending on the driver, the JSON may not be parsed for us.
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_headers(queryset: QuerySet, total_count: TotalCount) -> dict[str, str]:
+    """
+    Count the objects in the unpaginated queryset.
+
+    :param queryset: Unpaginated queryset to count.
+    :param total_count: How the total should be calculated, if at all.
+
+    :returns: Headers to add to the response.
+    """
+
+    if total_count is TotalCount.NONE:
+        return {}
+
+    if total_count is TotalCount.ESTIMATED and connections[queryset.db].vendor == 'postgresql':
+        return {TOTAL_COUNT_HEADER: str(estimated_count(queryset)), TOTAL_COUNT_TYPE_HEADER: 'estimated'}
+
+    return {TOTAL_COUNT_HEADER: str(queryset.count()), TOTAL_COUNT_TYPE_HEADER: 'exact'}
+
+
+async def acount_headers(queryset: QuerySet, total_count: TotalCount) -> dict[str, str]:
+    """ Like count_headers(), for async views. """
+
+    if total_count is TotalCount.NONE:
+        return {}
+
+    if total_count is TotalCount.ESTIMATED and connections[queryset.db].vendor == 'postgresql':
+        return {TOTAL_COUNT_HEADER: str(await sync_to_async(estimated_count)(queryset)), TOTAL_COUNT_TYPE_HEADER: 'estimated'}
+
+    return {TOTAL_COUNT_HEADER: str(await queryset.acount()), TOTAL_COUNT_TYPE_HEADER: 'exact'}
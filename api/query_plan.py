@@ -0,0 +1,62 @@
+""" select_related()/prefetch_related() plans matching the shape of generic serializers """
+
+from __future__ import annotations
+
+from typing import NamedTuple, Type, Iterable
+from django.db.models import Model, QuerySet, Prefetch
+
+
+class QueryPlan(NamedTuple):
+    """ The related objects a serializer will touch, and how the ORM should fetch them ahead of time. """
+
+    select_related: tuple[str, ...] = ()  # Forward ForeignKeys, joined into the same query.
+    prefetch_related: tuple[Prefetch, ...] = ()  # Related sets, fetched with one query per level.
+    only: tuple[str, ...] = ()  # Columns to load, including those of joined models. Empty loads every column.
+
+    def __or__(self, other: QueryPlan) -> QueryPlan:
+        return QueryPlan(self.select_related + other.select_related, self.prefetch_related + other.prefetch_related,
+                         self.only + other.only)
+
+    def __bool__(self) -> bool:
+        return bool(self.select_related or self.prefetch_related or self.only)
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        """ Annotate the queryset with the plan. """
+
+        if self.only:
+            queryset = queryset.only(*self.only)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    def selected(self, field_name: str) -> QueryPlan:
+        """
+        Move the plan behind a forward ForeignKey.
+
+        :param field_name: Name of the ForeignKey through which the plan's model is reached.
+
+        :returns: A plan joining the ForeignKey itself, as well as everything the original plan joins or prefetches.
+        """
+
+        return QueryPlan(
+            (field_name, *(f"{field_name}__{lookup}" for lookup in self.select_related)),
+            tuple(Prefetch(f"{field_name}__{prefetch.prefetch_through}", queryset=prefetch.queryset)
+                  for prefetch in self.prefetch_related),
+            tuple(f"{field_name}__{column}" for column in self.only),
+        )
+
+    def prefetched(self, accessor_name: str, related_model: Type[Model], required: Iterable[str] = ()) -> QueryPlan:
+        """
+        Move the plan behind a related set.
+
+        :param accessor_name: Name of the related manager through which the plan's model is reached.
+        :param related_model: Model of the related set.
+        :param required: Columns the ORM needs to match prefetched objects with their parents, like the ForeignKey back.
+
+        :returns: A plan prefetching the related set, with the original plan applied to the prefetch query.
+        """
+
+        plan = self._replace(only=(*self.only, *required)) if self.only else self
+        return QueryPlan((), (Prefetch(accessor_name, queryset=plan.apply(related_model.objects.all())),))
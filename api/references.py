@@ -0,0 +1,106 @@
+""" Batched resolution of objects referenced by primary key in payloads sent to generic serializers """
+
+from collections import defaultdict
+from typing import Type, Iterator, Iterable, Union
+from django.db.models import Model
+from rest_framework.fields import Field
+from rest_framework.relations import PrimaryKeyRelatedField, ManyRelatedField
+from rest_framework.serializers import Serializer, ModelSerializer, ListSerializer
+
+from .identity_map import as_pk, lookup, remember, in_bulk
+
+# Serializer context key, under which resolved objects are stored as {model: {pk: instance}}.
+REFERENCES_CONTEXT = 'resolved_references'
+
+
+def _reference_slots(serializer: Serializer, data: dict) -> Iterator[tuple[Union[dict, list], Union[str, int], Field]]:
+    """
+    Find every place in the payload where an object is referenced by its primary key.
+
+    :returns: Generator of (container, key, field), such that container[key] is the primary key for the field.
+    """
+
+    for fieldname, value in data.items():
+        field = serializer.fields.get(fieldname)
+        if isinstance(field, (ListSerializer, ManyRelatedField)):
+            if not isinstance(value, list):
+                continue
+            field = field.child if isinstance(field, ListSerializer) else field.child_relation
+            container, keys = value, range(len(value))
+        else:
+            container, keys = data, (fieldname,)
+
+        for key in keys:
+            item = container[key]
+            if isinstance(field, ModelSerializer):
+                if isinstance(item, dict):
+                    yield from _reference_slots(field, item)
+                elif isinstance(item, int) and not isinstance(item, bool):
+                    yield container, key, field
+            elif isinstance(field, PrimaryKeyRelatedField) and not field.read_only and item is not None:
+                yield container, key, field
+
+
+def resolve_references(serializer: Serializer, items: Iterable[dict]) -> dict[Type[Model], dict[object, Model]]:
+    """
+    Fetch every object referenced by the payload, with a single in_bulk() per model (and nested serializer).
+    Primary keys sent for nested serializers are replaced by the serialized object, like generic serializers always did.
+    This is done level by level, as the serialized objects may reference further objects by their primary keys.
+
+    :param serializer: Serializer which will validate each of the items.
+    :param items: Payloads to resolve, these are modified in place.
+
+    :returns: The fetched objects, to be served by ResolvedPrimaryKeyRelatedField through the serializer context.
+    """
+
+    references: dict[Type[Model], dict[object, Model]] = defaultdict(dict)
+    pending = [(serializer, item) for item in items if isinstance(item, dict)]
+    while pending:
+        slots = [slot for parent, item in pending for slot in _reference_slots(parent, item)]
+
+        # Nested serializers are fetched through their own query plan, so re-serializing the objects is free.
+        nested_pks: dict[Type[ModelSerializer], set] = defaultdict(set)
+        related_pks: dict[Type[Model], tuple[PrimaryKeyRelatedField, set]] = {}
+        for container, key, field in slots:
+            if isinstance(field, ModelSerializer):
+                nested_pks[type(field)].add(as_pk(field.Meta.model, container[key]))
+            else:
+                model = field.get_queryset().model
+                related_pks.setdefault(model, (field, set()))[1].add(as_pk(model, container[key]))
+
+        nested_objects: dict[Type[ModelSerializer], dict[object, Model]] = {}
+        for serializer_class, pks in nested_pks.items():
+            queryset = serializer_class.Meta.model.objects.all()
+            if plan := getattr(serializer_class, 'query_plan', None):
+                queryset = plan.apply(queryset)
+            nested_objects[serializer_class] = in_bulk(queryset, pks - {None})
+            references[serializer_class.Meta.model].update(nested_objects[serializer_class])
+        for model, (field, pks) in related_pks.items():
+            if missing := pks - {None} - references[model].keys():
+                references[model].update(in_bulk(field.get_queryset(), missing))
+
+        pending = []
+        for container, key, field in slots:
+            if isinstance(field, ModelSerializer):
+                instance = nested_objects[type(field)].get(as_pk(field.Meta.model, container[key]))
+                if instance is not None:  # Unknown primary keys are left for validation to complain about.
+                    container[key] = type(field)(instance).data
+                    pending.append((field, container[key]))
+
+    return references
+
+
+class ResolvedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, which looks objects up in the references resolved for the payload,
+    and in the request's identity map, before querying.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        instance = self.context.get(REFERENCES_CONTEXT, {}).get(queryset.model, {}).get(as_pk(queryset.model, data))
+        if instance is not None or (instance := lookup(queryset, data)) is not None:
+            return instance
+        instance = super().to_internal_value(data)
+        remember(queryset, (instance,))
+        return instance
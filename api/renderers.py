@@ -0,0 +1,151 @@
+""" Renderers for the generic web API, which can also write list responses incrementally """
+
+import csv
+import json
+from io import StringIO
+from typing import Iterable
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional, clients simply can't negotiate it without the package.
+    msgpack = None
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """ Regular JSON renderer, which can also write a list as a JSON array one chunk at a time. """
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterable[bytes]:
+        """
+        :param chunks: Lists of serialized objects, which together make up the response.
+
+        :returns: Generator of bytes, which together form a single JSON array.
+        """
+
+        yield b'['
+        first = True
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if not first:
+                yield b','
+            yield self.render(chunk)[1:-1]  # Strip the brackets, the chunks share a single array.
+            first = False
+        yield b']'
+
+
+class NDJSONRenderer(JSONRenderer):
+    """ Newline delimited JSON, one object per line. """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if isinstance(data, list):
+            return b''.join(self.render_stream((data,)))
+        return super().render(data, accepted_media_type, renderer_context) + b'\n'
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterable[bytes]:
+        for chunk in chunks:
+            for item in chunk:
+                yield super().render(item) + b'\n'
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Lists as {"columns": [...], "data": [[...], ...]}, so keys aren't repeated for every object.
+    Columns are the top level fields, nested objects are left as they are. Anything but a list is rendered as plain JSON.
+    """
+
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if isinstance(data, list):
+            return b''.join(self.render_stream((data,)))
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterable[bytes]:
+        columns = None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if columns is None:  # Every object of a generic serializer has the same fields.
+                columns = list(chunk[0].keys())
+                yield super().render({'columns': columns})[:-1] + b',"data":['
+            else:
+                yield b','
+            yield super().render([[item[column] for column in columns] for item in chunk])[1:-1]
+        yield b'{"columns":[],"data":[]}' if columns is None else b']}'
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Comma separated values, with a header row of the top level fields.
+    Nested objects and related sets don't fit in a cell, so they are written as JSON. Anything but a list is a single row.
+    """
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b''
+        return b''.join(self.render_stream((data if isinstance(data, list) else [data],)))
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterable[bytes]:
+        columns = None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+            if columns is None:  # Every object of a generic serializer has the same fields.
+                columns = list(chunk[0].keys())
+                writer.writerow(columns)
+            for item in chunk:
+                writer.writerow([json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False)
+                                 if isinstance(value, (dict, list)) else value for value in map(item.get, columns)])
+            yield buffer.getvalue().encode(self.charset)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ Binary MessagePack, lists are a single array, which isn't streamed. Requires the msgpack package. """
+
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def __init__(self):
+        self.packer = msgpack.Packer(default=encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b''
+        return self.packer.pack(data)
+
+
+class MessagePackSequenceRenderer(MessagePackRenderer):
+    """
+    MessagePack with lists written as consecutive objects (like NDJSON), so they can be streamed and read incrementally,
+    with msgpack.Unpacker rather than unpackb(). Anything but a list is a single object, just like application/x-msgpack.
+    """
+
+    media_type = 'application/x-msgpack-seq'
+    format = 'msgpack-seq'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if isinstance(data, list):
+            return b''.join(self.render_stream((data,)))
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterable[bytes]:
+        for chunk in chunks:
+            yield b''.join(self.packer.pack(item) for item in chunk)
+
+
+# Renderers whose optional dependencies are installed.
+OPTIONAL_RENDERERS = (MessagePackRenderer, MessagePackSequenceRenderer) if msgpack is not None else ()
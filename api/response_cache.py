@@ -0,0 +1,156 @@
+""" Server-side cache of rendered generic read responses, invalidated through the models they depend on """
+
+import time
+from hashlib import md5
+from threading import Lock
+from collections import Counter, defaultdict
+from typing import Type, Iterable, Optional, NamedTuple
+from django.conf import settings
+from django.db.models import Model
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer, ListSerializer
+
+from .signals import connect_listener
+
+_ENTRY_KEY = 'api-response:{}:{}'
+_TAG_KEY = 'api-response-tag:{}'
+CACHE_HEADER = 'X-Cache'
+
+_statistics: dict[str, Counter] = defaultdict(Counter)
+_statistics_lock = Lock()
+
+
+class CachedResponse(NamedTuple):
+    tags: dict[str, int]  # Versions of the tags when the response was generated, a newer version means it is stale.
+    content: bytes
+    content_type: str
+    headers: dict[str, str]
+
+
+def _cache():
+    # A LocMemCache keeps responses per worker process, Redis or Memcached lets every worker share them.
+    return caches[getattr(settings, 'API_RESPONSE_CACHE', 'default')]
+
+
+def _count(model: Type[Model], outcome: str) -> None:
+    with _statistics_lock:
+        _statistics[model._meta.label_lower][outcome] += 1
+
+
+def statistics() -> dict[str, dict[str, int]]:
+    """ Hits, misses and stale entries of this process, per model. """
+
+    with _statistics_lock:
+        return {label: dict(counter) for label, counter in _statistics.items()}
+
+
+def model_tag(model: Type[Model]) -> str:
+    return f"model:{model._meta.label_lower}"
+
+
+def object_tag(model: Type[Model], pk) -> str:
+    return f"object:{model._meta.label_lower}:{pk}"
+
+
+def list_tags(serializer_class: Type[ModelSerializer]) -> set[str]:
+    """ A list changes whenever any object of any model it serializes changes. """
+
+    return {model_tag(model) for model in serializer_class.dependencies}
+
+
+def detail_tags(serializer_class: Type[ModelSerializer], pk) -> set[str]:
+    """ A single object only changes with itself, and with the models of its nested serializers. """
+
+    model = serializer_class.Meta.model
+    nested = set(serializer_class.dependencies) - {model}
+    for field in serializer_class._declared_fields.values():
+        field = field.child if isinstance(field, ListSerializer) else field
+        if isinstance(field, ModelSerializer):  # Nested serializers may lead back to our own model.
+            nested |= type(field).dependencies
+    return {object_tag(model, pk)} | {model_tag(dependency) for dependency in nested}
+
+
+def response_key(model: Type[Model], request: Request) -> str:
+    """ Responses are cached per model, path (holding the pk), query parameters and negotiated media type. """
+
+    digest = md5(f"{request.get_full_path()}|{request.accepted_media_type}".encode(), usedforsecurity=False).hexdigest()
+    return _ENTRY_KEY.format(model._meta.label_lower, digest)
+
+
+def tag_versions(tags: Iterable[str]) -> dict[str, int]:
+    """ Must be read before the response is generated, so a concurrent write leaves the stored entry stale. """
+
+    cache = _cache()
+    keys = {_TAG_KEY.format(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys.keys() - versions.keys():
+            cache.add(key, time.time_ns(), timeout=None)
+        versions = cache.get_many(keys)
+    return {tag: versions.get(key) for key, tag in keys.items()}
+
+
+def get_response(model: Type[Model], key: str, headers: dict[str, str]) -> Optional[HttpResponse]:
+    """
+    :param model: Model of the endpoint, for statistics.
+    :param key: Key of the response from response_key().
+    :param headers: Headers to add to a cached response.
+
+    :returns: The cached response, or None if it is missing or stale.
+    """
+
+    cache = _cache()
+    entry: Optional[CachedResponse] = cache.get(key)
+    if entry is None:
+        _count(model, 'misses')
+        return None
+
+    current = cache.get_many([_TAG_KEY.format(tag) for tag in entry.tags])
+    if any(current.get(_TAG_KEY.format(tag)) != version for tag, version in entry.tags.items()):
+        cache.delete(key)
+        _count(model, 'stale')
+        return None
+
+    _count(model, 'hits')
+    return HttpResponse(entry.content, content_type=entry.content_type, headers=entry.headers | headers | {CACHE_HEADER: 'HIT'})
+
+
+def render(request: Request, data) -> tuple[bytes, str]:
+    """ Render data with the renderer chosen by content negotiation, ahead of DRF, into its content and content type. """
+
+    renderer = request.accepted_renderer
+    content = renderer.render(data, request.accepted_media_type, {'request': request})
+    return content, f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+
+
+def cache_response(key: str, versions: dict[str, int], request: Request, data, headers: dict[str, str], timeout: int) -> HttpResponse:
+    """
+    Render the data with the renderer chosen by content negotiation, and cache the result.
+
+    :param key: Key of the response from response_key().
+    :param versions: Tag versions from tag_versions(), read before the data was.
+    :param request: Request being answered.
+    :param data: Serialized data of the response.
+    :param headers: Headers of the response.
+    :param timeout: Seconds before the entry expires, regardless of invalidation.
+
+    :returns: The rendered response.
+    """
+
+    content, content_type = render(request, data)
+    _cache().set(key, CachedResponse(versions, content, content_type, headers), timeout)
+    return HttpResponse(content, content_type=content_type, headers=headers | {CACHE_HEADER: 'MISS'})
+
+
+def _on_change(model: Type[Model], action: str, pks: tuple) -> None:
+    cache = _cache()
+    for tag in (model_tag(model), *(object_tag(model, pk) for pk in pks)):
+        try:
+            cache.incr(_TAG_KEY.format(tag))
+        except ValueError:  # No cached response depends on the tag.
+            pass
+
+
+connect_listener(_on_change)
@@ -0,0 +1,57 @@
+""" Parsing of ?fields= and ?expand= into the shape of a response """
+
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+from rest_framework.exceptions import ValidationError
+
+
+class Shape(NamedTuple):
+    """ Hashable description of the fields and nested relations requested at one level of a response. """
+
+    fields: Optional[frozenset[str]] = None  # None includes every field.
+    expand: tuple[tuple[str, Shape], ...] = ()  # Relations to nest, sorted by name so equal shapes compare equal.
+
+
+def _split(param: str) -> list[list[str]]:
+    return [path.strip().split('.') for path in param.split(',') if path.strip()]
+
+
+def _build(field_paths: Optional[list[list[str]]], expand_paths: list[list[str]]) -> Shape:
+    expand_names = sorted({path[0] for path in expand_paths})
+
+    expand = []
+    for name in expand_names:
+        nested_expand = [path[1:] for path in expand_paths if path[0] == name and len(path) > 1]
+        nested_fields = None
+        if field_paths is not None:  # Fields of the relation default to all of them, unless some are named.
+            nested_fields = [path[1:] for path in field_paths if path[0] == name and len(path) > 1] or None
+        expand.append((name, _build(nested_fields, nested_expand)))
+
+    if field_paths is None:
+        return Shape(None, tuple(expand))
+    # Expanding, or selecting a field below, a relation implies including the relation itself.
+    return Shape(frozenset(path[0] for path in field_paths) | frozenset(expand_names), tuple(expand))
+
+
+def parse_shape(fields: Optional[str], expand: Optional[str], max_depth: int) -> Shape:
+    """
+    Parse comma separated lists of (dot separated) field paths.
+    ?fields=first_name,enrollments.grade&expand=enrollments includes the first name and the grade of each enrollment.
+
+    :param fields: Value of ?fields=, None to include all fields.
+    :param expand: Value of ?expand=, relations which should be nested rather than represented by primary keys.
+    :param max_depth: Maximum length of a path.
+
+    :returns: The shape of the response.
+    """
+
+    field_paths = _split(fields) if fields is not None else None
+    expand_paths = _split(expand or '')
+    for param, paths in (('fields', field_paths or ()), ('expand', expand_paths)):
+        for path in paths:
+            if not all(part.strip() for part in path):
+                raise ValidationError({param: [f"'{'.'.join(path)}' is not a valid field path."]})
+            if len(path) > max_depth + 1:
+                raise ValidationError({param: [f"'{'.'.join(path)}' is nested deeper than {max_depth} levels."]})
+    return _build(field_paths, expand_paths)
@@ -0,0 +1,147 @@
+""" Notification of committed writes to the models exposed through the generic web API """
+
+import logging
+from typing import Type, Iterable, Callable, Optional
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+logger = logging.getLogger(__name__)
+
+# Called with (model, action, primary keys) once the write is committed.
+# An empty tuple of primary keys means an unknown set of rows changed, like for the through table of a ManyToManyField.
+ChangeListener = Callable[[Type[Model], str, tuple], None]
+# Called once per commit with every (model, action, primary keys) written in the transaction, before the listeners above,
+# by stores which they (or their subscribers) read from.
+BatchListener = Callable[[list[tuple[Type[Model], str, tuple]]], None]
+
+_listeners: list[ChangeListener] = []
+_batch_listeners: list[BatchListener] = []
+# Called right away instead, even within a transaction which may still roll back,
+# by caches of the current request, which must never serve objects it has overwritten.
+_write_listeners: list[ChangeListener] = []
+
+_tracked_models: set[Type[Model]] = set()
+
+
+def connect_listener(listener: ChangeListener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def connect_batch_listener(listener: BatchListener) -> None:
+    if listener not in _batch_listeners:
+        _batch_listeners.append(listener)
+
+
+def connect_write_listener(listener: ChangeListener) -> None:
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+class _Batch:
+    """ The writes of a transaction, dispatched together once it commits. """
+
+    def __init__(self):
+        # Primary keys by model and action, None when an unknown set of rows changed.
+        self.pks: dict[tuple[Type[Model], str], Optional[dict]] = {}
+
+    def add(self, model: Type[Model], action: str, pks: tuple) -> None:
+        if not pks:
+            self.pks[(model, action)] = None
+        elif (known := self.pks.setdefault((model, action), {})) is not None:
+            known.update(dict.fromkeys(pks))
+
+    def dispatch(self) -> None:
+        _dispatch([(model, action, tuple(pks or ())) for (model, action), pks in self.pks.items()])
+
+
+def notify_changed(model: Type[Model], action: str, pks: Iterable = (), using: str = None) -> None:
+    """
+    Tell listeners about a write, once the current transaction (if any) commits.
+    Writes within the same transaction are dispatched together, each model and action once with all of their primary keys.
+    Writes which don't send signals, like bulk_create() and bulk_update(), must call this themselves.
+    """
+
+    pks = tuple(pks)
+    for listener in _write_listeners:
+        listener(model, action, pks)
+
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        _dispatch([(model, action, pks)])
+        return
+    batch: Optional[_Batch] = getattr(connection, 'api_changes_batch', None)
+    # The dispatch of a batch is discarded when the transaction (or the savepoint it began in) rolls back.
+    # Writes of rolled back savepoints which joined an earlier batch are still dispatched, listeners only refresh more then.
+    if batch is None or not any(callback[1] == batch.dispatch for callback in connection.run_on_commit):
+        batch = connection.api_changes_batch = _Batch()
+        transaction.on_commit(batch.dispatch, using=using)
+    batch.add(model, action, pks)
+
+
+def _call(listener: Callable, *args) -> None:
+    # The write is committed already, a listener failing mustn't keep the others from invalidating what they keep.
+    try:
+        listener(*args)
+    except Exception:
+        logger.exception("Change listener %r failed.", listener)
+
+
+def _dispatch(changes: list[tuple[Type[Model], str, tuple]]) -> None:
+    for listener in _batch_listeners:
+        _call(listener, changes)
+    for model, action, pks in changes:
+        for listener in _listeners:
+            _call(listener, model, action, pks)
+
+
+def _on_save(sender: Type[Model], instance: Model, created: bool, using: str = None, **kwargs) -> None:
+    notify_changed(sender, CREATED if created else UPDATED, (instance.pk,), using)
+
+
+def _on_delete(sender: Type[Model], instance: Model, using: str = None, **kwargs) -> None:
+    notify_changed(sender, DELETED, (instance.pk,), using)
+
+
+def _on_m2m_changed(sender: Type[Model], instance: Model, model: Type[Model], action: str, pk_set: set = None, using: str = None, **kwargs) -> None:
+    if not action.startswith('post_'):
+        return
+    notify_changed(sender, UPDATED, (), using)
+    notify_changed(type(instance), UPDATED, (instance.pk,), using)
+    notify_changed(model, UPDATED, pk_set or (), using)
+
+
+def track_models(models: Iterable[Type[Model]]) -> None:
+    """ Notify listeners about every write to the models, and to the through tables of their ManyToManyFields. """
+
+    for model in models:
+        _tracked_models.add(model)
+        uid = f"api-changes-{model._meta.label_lower}"
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(_on_m2m_changed, sender=field.remote_field.through, dispatch_uid=f"{uid}-{field.name}")
+
+
+def is_tracked(model: Type[Model]) -> bool:
+    """ Whether listeners are told about every write to the model, see track_models(). """
+
+    return model in _tracked_models
+
+
+def related_models(model: Type[Model]) -> set[Type[Model]]:
+    """ Every model which can be reached from the model through relations, including the model itself. """
+
+    seen = {model}
+    pending = [model]
+    while pending:
+        for field in pending.pop()._meta.get_fields():
+            if field.is_relation and field.related_model is not None and field.related_model not in seen:
+                seen.add(field.related_model)
+                pending.append(field.related_model)
+    return seen
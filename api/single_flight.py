@@ -0,0 +1,234 @@
+""" Single-flight reads, identical concurrent requests wait on a single evaluation and share its rendered response """
+
+import copy
+import time
+import asyncio
+from uuid import uuid4
+from hashlib import md5
+from threading import Lock, Event
+from typing import Type, Optional, Callable, Awaitable, NamedTuple, Iterable
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+from django.http import HttpResponse, HttpResponseBase
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .response_cache import render
+from .versions import get_versions
+from .costs import _timeout
+
+FLIGHT_HEADER = 'X-Single-Flight'
+_FLIGHT_KEY = 'api-flight:{}:{}'
+_RESULT_KEY = '{}:result:{}'
+_LOCK_TIMEOUT = 30  # Seconds before the lock of a leader which never finished is released, and followers give up waiting.
+_RESULT_TIMEOUT = 10  # Seconds a shared response is kept for the followers in other processes to pick up.
+_POLL_INTERVAL = 0.02  # Seconds between checks of followers waiting on a leader in another process.
+_WAIT_MARGIN = 1  # Seconds followers wait for a leader in this process beyond the statement timeout of the read.
+
+
+class SharedResponse(NamedTuple):
+    content: bytes
+    status: int
+    headers: tuple[tuple[str, str], ...]
+
+    @classmethod
+    def of(cls, response: HttpResponse) -> 'SharedResponse':
+        return cls(response.content, response.status_code, tuple(response.items()))
+
+    def response(self) -> HttpResponse:
+        return HttpResponse(self.content, status=self.status, headers=dict(self.headers) | {FLIGHT_HEADER: 'SHARED'})
+
+
+class _Flight:
+    """ An evaluation in progress in this process, and the coroutines waiting on it. """
+
+    def __init__(self):
+        self.landed = Event()
+        self.shared: Optional[SharedResponse] = None
+        self.error: Optional[BaseException] = None
+        self.waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def result(self) -> Optional[HttpResponse]:
+        """ :returns: The shared response, or None when the leader was interrupted, so followers must evaluate themselves. """
+
+        if self.error is not None:  # Like 404 or QueryTimeout, which the followers would have run into as well.
+            raise copy.copy(self.error)
+        return self.shared.response() if self.shared is not None else None
+
+
+_flights: dict[str, _Flight] = {}
+_flights_lock = Lock()
+
+
+def flight_key(model: Type[Model], request: Request, headers: dict[str, str], dependencies: Iterable[Type[Model]]) -> str:
+    """
+    Reads are identical with the same model, path (holding the pk), query parameters and negotiated media type,
+    and the same versions of the models they depend on, so reads arriving after a write don't join a flight from before it.
+
+    :param headers: Headers of the response, whose ETag already holds the versions, when there is one.
+    :param dependencies: Every model the response depends on, whose versions are read when there's no ETag.
+    """
+
+    versions = headers.get('ETag') or get_versions(dependencies)[0]
+    digest = md5(f"{request.get_full_path()}|{request.accepted_media_type}|{versions}".encode(), usedforsecurity=False).hexdigest()
+    return _FLIGHT_KEY.format(model._meta.label_lower, digest)
+
+
+def _wait_time(endpoint: str) -> float:
+    """ Seconds followers wait for their leader in this process, before evaluating the read themselves. """
+
+    timeout = _timeout(endpoint)
+    return _LOCK_TIMEOUT if timeout is None else timeout / 1000 + _WAIT_MARGIN
+
+
+def _shared_cache():
+    # Locking through a cache shared by every worker process (e.g. Redis) lets them wait on each other's flights too.
+    alias = getattr(settings, 'API_SINGLE_FLIGHT_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _rendered(request: Request, response: HttpResponseBase) -> HttpResponse:
+    """ DRF renders Responses after the view has returned, those to be shared are rendered right away. """
+
+    if not isinstance(response, Response):
+        return response
+    content, content_type = render(request, response.data)
+    headers = {name: value for name, value in response.items() if name.lower() != 'content-type'}
+    return HttpResponse(content, content_type=content_type, status=response.status_code, headers=headers)
+
+
+def _join(key: str) -> tuple[_Flight, bool]:
+    """ :returns: The flight of the key, and whether it was just started, so the caller leads it. """
+
+    with _flights_lock:
+        if (flight := _flights.get(key)) is not None:
+            return flight, False
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _land(key: str, flight: _Flight, response: Optional[HttpResponse] = None, error: Optional[BaseException] = None) -> None:
+    """ End the flight, handing its response (or error) to every request waiting on it. """
+
+    with _flights_lock:
+        del _flights[key]  # Requests arriving from now on start a new flight.
+        flight.shared = SharedResponse.of(response) if response is not None else None
+        flight.error = error
+        flight.landed.set()
+        waiters, flight.waiters = flight.waiters, []
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_wake, future)
+        except RuntimeError:  # The loop was closed in the meantime.
+            pass
+
+
+def _lead(key: str, evaluate: Callable[[], HttpResponse]) -> HttpResponse:
+    """ Evaluate the read for this process, or wait for another process which is already evaluating it. """
+
+    if (cache := _shared_cache()) is None:
+        return evaluate()
+
+    flight_id, leader = uuid4().hex, None
+    deadline = time.monotonic() + _LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        # Leaders release the lock once their response is stored, so it is looked for before trying to take the lock.
+        if leader and (shared := cache.get(_RESULT_KEY.format(key, leader))) is not None:
+            return shared.response()
+        if cache.add(key, flight_id, timeout=_LOCK_TIMEOUT):
+            try:
+                response = evaluate()
+                cache.set(_RESULT_KEY.format(key, flight_id), SharedResponse.of(response), _RESULT_TIMEOUT)
+                return response
+            finally:
+                cache.delete(key)
+        leader = cache.get(key) or leader
+        time.sleep(_POLL_INTERVAL)
+    return evaluate()
+
+
+async def _alead(key: str, evaluate: Callable[[], Awaitable[HttpResponse]]) -> HttpResponse:
+    """ Like _lead(), for coroutines. """
+
+    if (cache := _shared_cache()) is None:
+        return await evaluate()
+
+    flight_id, leader = uuid4().hex, None
+    deadline = time.monotonic() + _LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        if leader and (shared := await cache.aget(_RESULT_KEY.format(key, leader))) is not None:
+            return shared.response()
+        if await cache.aadd(key, flight_id, timeout=_LOCK_TIMEOUT):
+            try:
+                response = await evaluate()
+                await cache.aset(_RESULT_KEY.format(key, flight_id), SharedResponse.of(response), _RESULT_TIMEOUT)
+                return response
+            finally:
+                await cache.adelete(key)
+        leader = await cache.aget(key) or leader
+        await asyncio.sleep(_POLL_INTERVAL)
+    return await evaluate()
+
+
+def single_flight(key: str, request: Request, evaluate: Callable[[], HttpResponseBase], endpoint: str) -> HttpResponseBase:
+    """
+    Evaluate a read once for every identical request in flight at the same time.
+    The first request evaluates it, the others wait for its rendered response, and are answered with a copy of it.
+    Followers of a leader taking longer than the statement timeout of the endpoint class evaluate the read themselves.
+
+    :param key: Key of the read from flight_key().
+    :param request: Request being answered.
+    :param evaluate: Queries, serializes and returns the response, which mustn't be streamed.
+    :param endpoint: Endpoint class of the read, like costs.LIST.
+    """
+
+    flight, leading = _join(key)
+    if not leading:
+        if flight.landed.wait(_wait_time(endpoint)) and (response := flight.result()) is not None:
+            return response
+        return evaluate()
+    try:
+        response = _lead(key, lambda: _rendered(request, evaluate()))
+    except BaseException as e:
+        _land(key, flight, error=e if isinstance(e, Exception) else None)  # Not when cancelled or interrupted.
+        raise
+    _land(key, flight, response)
+    return response
+
+
+async def asingle_flight(key: str, request: Request, evaluate: Callable[[], Awaitable[HttpResponseBase]],
+                        endpoint: str) -> HttpResponseBase:
+    """ Like single_flight(), for coroutines, which wait on the event loop rather than holding a thread. """
+
+    flight, leading = _join(key)
+    if not leading:
+        loop = asyncio.get_running_loop()
+        with _flights_lock:
+            future = None if flight.landed.is_set() else loop.create_future()
+            if future is not None:
+                flight.waiters.append((loop, future))
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, _wait_time(endpoint))
+            except asyncio.TimeoutError:
+                return await evaluate()
+        if (response := flight.result()) is not None:
+            return response
+        return await evaluate()
+
+    async def rendered() -> HttpResponse:
+        return _rendered(request, await evaluate())
+
+    try:
+        response = await _alead(key, rendered)
+    except BaseException as e:
+        _land(key, flight, error=e if isinstance(e, Exception) else None)
+        raise
+    _land(key, flight, response)
+    return response
@@ -0,0 +1,48 @@
+""" Chunked serialization of querysets, so large responses can be written without holding them in memory """
+
+from itertools import islice
+from typing import Type, Iterator
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.serializers import ModelSerializer
+
+from .flat import flat_encoder
+
+_DEFAULT_CHUNK_SIZE = 500
+
+
+def serialized_chunks(serializer_class: Type[ModelSerializer], queryset: QuerySet, chunk_size: int = _DEFAULT_CHUNK_SIZE) -> Iterator[list]:
+    """
+    Serialize a queryset one chunk at a time.
+    Prefetches of the serializer's query plan are performed once per chunk.
+
+    :param serializer_class: Serializer used for every object.
+    :param queryset: Objects to serialize, they are fetched lazily with .iterator().
+    :param chunk_size: Number of objects fetched from the database and serialized at a time.
+
+    :returns: Generator of lists of serialized objects.
+    """
+
+    if (encoder := flat_encoder(serializer_class)) is not None:
+        rows = encoder.rows(queryset).iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield encoder.fetch_and_encode(chunk)
+        return
+
+    instances = serializer_class.query_plan.apply(queryset).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(instances, chunk_size)):
+        yield serializer_class(chunk, many=True).data
+
+
+def streaming_response(renderer: BaseRenderer, chunks: Iterator[list], headers: dict[str, str] = None) -> StreamingHttpResponse:
+    """
+    :param renderer: Renderer implementing render_stream(), usually the one accepted by content negotiation.
+    :param chunks: Lists of serialized objects to write.
+    :param headers: Extra headers for the response.
+
+    :returns: A response which renders the chunks as they are being sent.
+    """
+
+    content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+    return StreamingHttpResponse(renderer.render_stream(chunks), content_type=content_type, headers=headers)
@@ -0,0 +1,66 @@
+""" Partial (PATCH) updates of generic serializers, which only write what actually changed """
+
+from django.db.models import Model
+from drf_writable_nested import WritableNestedModelSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils import model_meta
+
+from .identity_map import as_pk, in_bulk
+
+
+class PartialUpdateSerializer(WritableNestedModelSerializer):
+    """
+    Base of generic serializers. When instantiated with partial=True, fields absent from the payload are left alone,
+    including nested related sets, and only the columns whose values changed are saved with update_fields.
+    Nested serializers of existing objects are partial too, so the same goes for every nested object.
+    Nested objects are fetched through the request's identity map, rather than once per nested serializer.
+    """
+
+    def _prefetch_related_instances(self, field, related_data) -> dict[str, Model]:
+        instances = in_bulk(field.Meta.model.objects.all(), self._extract_related_pks(field, related_data))
+        return {str(pk): instance for pk, instance in instances.items()}
+
+    def update_or_create_direct_relations(self, attrs: dict, relations: dict) -> None:
+        # Like WritableNestedModelSerializer's, but looked up with in_bulk() rather than .filter(pk=pk).first().
+        for field_name, (field, field_source) in relations.items():
+            data = self.get_initial()[field_name]
+            model_class = field.Meta.model
+            instance = None
+            if pk := self._get_related_pk(data, model_class):
+                instance = in_bulk(model_class.objects.all(), (pk,)).get(as_pk(model_class, pk))
+            serializer = self._get_serializer_for_field(field, instance=instance, data=data)
+            try:
+                serializer.is_valid(raise_exception=True)
+                attrs[field_source] = serializer.save(**self._get_save_kwargs(field_name))
+            except ValidationError as exc:
+                raise ValidationError({field_name: exc.detail})
+
+    def update(self, instance: Model, validated_data: dict) -> Model:
+        if not self.partial:
+            return super().update(instance, validated_data)
+
+        relations, reverse_relations = self._extract_relations(validated_data)
+        self.update_or_create_direct_relations(validated_data, relations)
+
+        # Like ModelSerializer.update(), but columns which already hold the received values aren't written.
+        info = model_meta.get_field_info(instance)
+        changed_fields, m2m_fields = [], []
+        for attr, value in validated_data.items():
+            if attr in info.relations and info.relations[attr].to_many:
+                m2m_fields.append((attr, value))
+                continue
+            field = instance._meta.get_field(attr)
+            previous = field.value_from_object(instance)
+            setattr(instance, attr, value)
+            if field.value_from_object(instance) != previous:
+                changed_fields.append(field.name)
+        if changed_fields:  # Otherwise the row isn't even locked.
+            instance.save(update_fields=changed_fields)
+        for attr, value in m2m_fields:
+            getattr(instance, attr).set(value)  # Only adds and removes the links which differ.
+
+        self.update_or_create_reverse_relations(instance, reverse_relations)
+        self.delete_reverse_relations_if_need(instance, reverse_relations)  # Only for related sets in the payload.
+        if relations or reverse_relations:
+            instance.refresh_from_db()
+        return instance
@@ -0,0 +1,242 @@
+""" Creation of objects which may already exist, identified by their unique_together or unique fields """
+
+import operator
+from functools import reduce
+from typing import Type, Iterable, Iterator, Optional
+from django.db import connections, router
+from django.db.models import Model, Field, Q
+from rest_framework.serializers import Serializer
+from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
+
+from .signals import CREATED, UPDATED, notify_changed
+
+UNCHANGED = 'unchanged'
+UPSERT_HEADER = 'X-Upsert-Result'  # Whether an upserted object was created, updated or left unchanged.
+
+# How objects which already exist are handled.
+UPDATE = 'update'
+IGNORE = 'ignore'
+ERROR = 'error'  # Not an upsert, the unique constraint fails.
+ON_CONFLICT = (UPDATE, IGNORE, ERROR)
+
+
+def conflict_fields(model: Type[Model]) -> tuple[Field, ...]:
+    """ Fields identifying an object besides its primary key, those of the first unique_together, or the first unique field. """
+
+    for names in model._meta.unique_together:
+        return tuple(model._meta.get_field(name) for name in names)
+    for field in model._meta.concrete_fields:
+        if field.unique and not field.primary_key:
+            return field,
+    return ()
+
+
+def unique_checks(model: Type[Model]) -> list[tuple[Field, ...]]:
+    """ Fields of each unique_together, and each unique field besides the primary key, which must be unique together. """
+
+    checks = [tuple(model._meta.get_field(name) for name in names) for names in model._meta.unique_together]
+    return checks + [(field,) for field in model._meta.concrete_fields if field.unique and not field.primary_key]
+
+
+def _add_unique_error(errors: dict[str, list[str]], model: Type[Model], fields: tuple[Field, ...]) -> None:
+    """ Add the error DRF's UniqueTogetherValidator or UniqueValidator would report. """
+
+    names = tuple(field.name for field in fields)
+    if names in map(tuple, model._meta.unique_together):
+        errors.setdefault('non_field_errors', []).append(UniqueTogetherValidator.message.format(field_names=', '.join(names)))
+        return
+    field, = fields
+    errors.setdefault(field.name, []).append(field.error_messages['unique'] % {'model_name': model._meta.verbose_name,
+                                                                               'field_label': field.verbose_name})
+
+
+def unique_errors(model: Type[Model], instances: list[Model], batch_size: int, written: Iterable[str] = None) -> list[dict]:
+    """
+    Check that unsaved values of the instances are unique, among each other and in the database.
+    Unlike the uniqueness validators of serializers, which query once per object, this queries once per check and batch.
+    Like the validators, a stored value only doesn't conflict with the object it is stored for.
+
+    :param written: Names of the fields being written, only checks including one of them are made. None makes every check.
+
+    :returns: Errors per instance, like those of a list serializer, empty for valid instances.
+    """
+
+    errors: list[dict] = [{} for _ in instances]
+    for fields in unique_checks(model):
+        if written is not None and not any(field.name in written for field in fields):
+            continue
+        first: dict[tuple, int] = {}  # Index of the first instance with each key.
+        for index, instance in enumerate(instances):
+            key = key_of(instance, fields)
+            if None not in key and first.setdefault(key, index) != index:  # Like the validators, NULLs are never equal.
+                _add_unique_error(errors[index], model, fields)
+
+        keys = list(first.items())
+        for start in range(0, len(keys), batch_size):
+            batch = dict(keys[start:start + batch_size])
+            for key, (pk,) in _existing(model, batch, [], fields).items():
+                if pk != instances[batch[key]].pk:
+                    _add_unique_error(errors[batch[key]], model, fields)
+    return errors
+
+
+def insert_columns(model: Type[Model]) -> list[Field]:
+    """ Columns written when creating objects, those of the model's concrete fields, except an automatic primary key. """
+
+    return [field for field in model._meta.concrete_fields if field is not model._meta.auto_field]
+
+
+def update_columns(model: Type[Model]) -> list[Field]:
+    """ Columns written to objects which already exist, the identifying ones and those set on creation keep their value. """
+
+    key_fields = conflict_fields(model)
+    return [field for field in insert_columns(model) if field not in key_fields and not getattr(field, 'auto_now_add', False)]
+
+
+def without_unique_validators(serializer: Serializer) -> Serializer:
+    """ Drop the uniqueness validators of a (list) serializer, as conflicts are handled by the upsert instead. """
+
+    child = getattr(serializer, 'child', serializer)
+    child.validators = [validator for validator in child.validators if not isinstance(validator, UniqueTogetherValidator)]
+    for field in child.fields.values():
+        field.validators = [validator for validator in field.validators if not isinstance(validator, UniqueValidator)]
+    return serializer
+
+
+def conflict_clause(model: Type[Model], on_conflict: str) -> str:
+    """
+    PostgreSQL ON CONFLICT clause of an INSERT into the model's table.
+    Objects which wouldn't change aren't written, so they are neither locked nor returned by RETURNING.
+    """
+
+    quote = connections[router.db_for_write(model)].ops.quote_name
+    key_columns = ', '.join(quote(field.column) for field in conflict_fields(model))
+    columns = [quote(field.column) for field in update_columns(model)]
+    if on_conflict != UPDATE or not columns:
+        return f"ON CONFLICT ({key_columns}) DO NOTHING"
+    target = ', '.join(f"{quote(model._meta.db_table)}.{column}" for column in columns)
+    excluded = ', '.join(f"EXCLUDED.{column}" for column in columns)
+    return f"ON CONFLICT ({key_columns}) DO UPDATE SET ({', '.join(columns)}) = ROW({excluded}) " \
+           f"WHERE ROW({target}) IS DISTINCT FROM ROW({excluded})"
+
+
+def key_of(instance: Model, key_fields: tuple[Field, ...]) -> tuple:
+    return tuple(getattr(instance, field.attname) for field in key_fields)
+
+
+def _existing(model: Type[Model], keys, fields: list[Field], key_fields: tuple[Field, ...] = None) -> dict[tuple, tuple]:
+    """ The values of the fields, followed by the primary key, of the objects with the keys (of conflict_fields()), by key. """
+
+    key_fields = key_fields or conflict_fields(model)
+    rows = model._base_manager.filter(reduce(operator.or_, (
+        Q(**{field.attname: value for field, value in zip(key_fields, key)}) for key in keys
+    ))).values_list(*(field.attname for field in (*key_fields, *fields)), 'pk')
+    return {row[:len(key_fields)]: row[len(key_fields):] for row in rows}
+
+
+def insert_returning(model: Type[Model], source: str, params: Optional[list], conflict: str, batch_size: int,
+                     returned: tuple[Field, ...] = ()) -> Iterator[tuple[list[tuple], list[tuple]]]:
+    """
+    INSERT the rows of the source, a VALUES list or a SELECT of the insert_columns(), into the model's table on PostgreSQL.
+
+    :param conflict: The conflict_clause() of the insert, or an empty string.
+    :param returned: Fields returned with the primary key of each written row.
+
+    :returns: The written rows, in batches of created and of updated rows, each as (pk, *returned).
+    """
+
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    column_names = ', '.join(quote(field.column) for field in insert_columns(model))
+    returned_names = ''.join(f", {quote(field.column)}" for field in returned)
+    with connection.cursor() as cursor:
+        # xmax is only set for rows which already existed, that is, which were updated.
+        cursor.execute(f"INSERT INTO {quote(model._meta.db_table)} ({column_names}) {source} {conflict} "
+                       f"RETURNING {quote(model._meta.pk.column)}, xmax = 0{returned_names}", params)
+        while rows := cursor.fetchmany(batch_size):
+            yield [(pk, *rest) for pk, inserted, *rest in rows if inserted], \
+                  [(pk, *rest) for pk, inserted, *rest in rows if not inserted]
+
+
+def _upsert_returning(model: Type[Model], instances: list[Model], on_conflict: str, batch_size: int) -> dict[str, list[Model]]:
+    """ A single INSERT ... ON CONFLICT per batch, which tells created and updated rows apart by their xmax. """
+
+    connection = connections[router.db_for_write(model)]
+    key_fields, columns = conflict_fields(model), insert_columns(model)
+    placeholders = f"({', '.join(['%s'] * len(columns))})"
+
+    outcome: dict[str, list[Model]] = {CREATED: [], UPDATED: [], UNCHANGED: []}
+    for start in range(0, len(instances), batch_size):
+        batch = {key_of(instance, key_fields): instance for instance in instances[start:start + batch_size]}
+        params = [field.get_db_prep_save(field.pre_save(instance, True), connection)
+                  for instance in batch.values() for field in columns]
+        source, conflict = f"VALUES {', '.join([placeholders] * len(batch))}", conflict_clause(model, on_conflict)
+        for created, updated in insert_returning(model, source, params, conflict, batch_size, key_fields):
+            for action, rows in ((CREATED, created), (UPDATED, updated)):
+                for pk, *key in rows:
+                    instance = batch.pop(tuple(key))
+                    instance.pk = pk
+                    instance._state.adding = False
+                    outcome[action].append(instance)
+        if batch:  # Objects which already existed, and weren't written.
+            for key, (pk,) in _existing(model, batch, []).items():
+                batch[key].pk = pk
+                batch[key]._state.adding = False
+            outcome[UNCHANGED] += batch.values()
+    return outcome
+
+
+def _upsert_lookup(model: Type[Model], instances: list[Model], on_conflict: str, batch_size: int) -> dict[str, list[Model]]:
+    """ Look the objects up by their keys, then bulk_create() the new and bulk_update() the changed ones. """
+
+    key_fields, columns = conflict_fields(model), update_columns(model)
+    outcome: dict[str, list[Model]] = {CREATED: [], UPDATED: [], UNCHANGED: []}
+    for start in range(0, len(instances), batch_size):
+        batch = {key_of(instance, key_fields): instance for instance in instances[start:start + batch_size]}
+        existing = _existing(model, batch, columns)
+        created = [instance for key, instance in batch.items() if key not in existing]
+        outcome[CREATED] += model._base_manager.bulk_create(created, batch_size=batch_size)
+
+        changed = []
+        for key, (*values, pk) in existing.items():
+            instance = batch[key]
+            instance.pk = pk
+            instance._state.adding = False
+            if on_conflict == UPDATE and [getattr(instance, field.attname) for field in columns] != values:
+                changed.append(instance)
+            else:
+                outcome[UNCHANGED].append(instance)
+        if changed:
+            model._base_manager.bulk_update(changed, [field.name for field in columns], batch_size=batch_size)
+            outcome[UPDATED] += changed
+    return outcome
+
+
+def upsert(model: Type[Model], instances: list[Model], on_conflict: str, batch_size: int) -> dict[str, list[Model]]:
+    """
+    Create the objects, or update (or leave) those whose conflict_fields() identify an existing object.
+    On PostgreSQL each batch is a single INSERT ... ON CONFLICT, so concurrent upserts of the same object can't both create it.
+    Elsewhere existing objects are looked up first, which must happen in a transaction.
+
+    :param model: Model of the objects, which must have conflict_fields().
+    :param instances: Unsaved objects, each with a different key. They get the primary keys of the objects they became.
+    :param on_conflict: UPDATE or IGNORE.
+    :param batch_size: Maximum number of objects per statement.
+
+    :returns: The instances which were created, updated and left unchanged.
+    """
+
+    assert conflict_fields(model) and on_conflict in (UPDATE, IGNORE)
+    if not instances:
+        return {CREATED: [], UPDATED: [], UNCHANGED: []}
+    if connections[router.db_for_write(model)].vendor == 'postgresql':
+        outcome = _upsert_returning(model, instances, on_conflict, batch_size)
+    else:
+        outcome = _upsert_lookup(model, instances, on_conflict, batch_size)
+
+    # Neither kind of write sends post_save.
+    if outcome[CREATED]:
+        notify_changed(model, CREATED, [instance.pk for instance in outcome[CREATED]])
+    if outcome[UPDATED]:
+        notify_changed(model, UPDATED, [instance.pk for instance in outcome[UPDATED]])
+    return outcome
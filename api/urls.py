@@ -1,21 +1,26 @@
 from django.urls import path
 
-from .views import generic_crud, crud_overview
+from .views import generic_crud, crud_overview, response_cache_statistics, changes
+from .batch import batch
+from .pagination import Pagination, TotalCount
 from contoso_university.models import Student, Enrollment, Instructor, Course, Curriculum
 from tasks.models import Task, Todo, Worker, Team
 
 urlpatterns = [
-    *generic_crud(Student),
-    *generic_crud(Enrollment),
+    *generic_crud(Student, streaming=True, materialized_depths=(2,)),
+    *generic_crud(Enrollment, pagination=Pagination.KEYSET, total_count=TotalCount.ESTIMATED, streaming=True),
     *generic_crud(Course),
     *generic_crud(Curriculum),
     *generic_crud(Instructor),
 
     *generic_crud(Task),
-    *generic_crud(Todo),
+    *generic_crud(Todo, unindexed_filters=('complete',)),
     *generic_crud(Worker),
-    *generic_crud(Team),
+    *generic_crud(Team, cache_timeout=60, materialized_depths=(2,)),
 
+    path('response-cache-statistics/', response_cache_statistics, name='response-cache-statistics'),
+    path('batch/', batch, name='batch'),
+    path('changes/', changes, name='changes'),
 ]
 
 crud_overview(urlpatterns)
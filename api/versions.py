@@ -0,0 +1,97 @@
+""" Per-model change versions, used to answer conditional requests without serializing anything """
+
+import time
+from hashlib import md5
+from typing import Type, Iterable, Optional
+from django.conf import settings
+from django.db.models import Model
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date, quote_etag
+
+from .signals import connect_listener
+
+_VERSION_KEY = 'api-version:{}'
+_MODIFIED_KEY = 'api-modified:{}'
+
+
+def _cache():
+    # Must be shared between worker processes, or a worker may answer 304 for a change made through another one.
+    return caches[getattr(settings, 'API_VERSION_CACHE', 'default')]
+
+
+def bump_version(*models: Type[Model]) -> None:
+    """ Mark the models as changed, this invalidates the ETags of every response depending on them. """
+
+    cache = _cache()
+    for model in models:
+        key = _VERSION_KEY.format(model._meta.label_lower)
+        try:
+            cache.incr(key)
+        except ValueError:  # Unknown versions are initialized when they are read.
+            pass
+    # Never ahead of the clock, as Last-Modified may not be later than Date. Changes within the same second as a read
+    # share its Last-Modified, they are told apart by the ETag, which If-None-Match takes precedence with.
+    cache.set_many({_MODIFIED_KEY.format(model._meta.label_lower): time.time() for model in models}, timeout=None)
+
+
+def get_versions(models: Iterable[Type[Model]]) -> tuple[tuple[int, ...], float]:
+    """
+    :param models: Models to get the versions for.
+
+    :returns: The current version of each model (sorted by label), and the time of the latest change to any of them.
+    """
+
+    cache = _cache()
+    labels = sorted(model._meta.label_lower for model in models)
+    version_keys = [_VERSION_KEY.format(label) for label in labels]
+    modified_keys = [_MODIFIED_KEY.format(label) for label in labels]
+    values = cache.get_many(version_keys + modified_keys)
+
+    if any(key not in values for key in version_keys + modified_keys):
+        # Versions start at the current time rather than 0, so ETags from before a restart of the cache never match.
+        for key in version_keys:
+            cache.add(key, time.time_ns(), timeout=None)
+        for key in modified_keys:
+            cache.add(key, time.time(), timeout=None)
+        values = cache.get_many(version_keys + modified_keys)
+
+    now = time.time()
+    versions = tuple(values.get(key, 0) for key in version_keys)
+    last_modified = max((values.get(key, now) for key in modified_keys), default=now)
+    return versions, last_modified
+
+
+def version_headers(request: HttpRequest, models: Iterable[Type[Model]], variant: str = '') -> dict[str, str]:
+    """
+    :param request: Request to calculate the headers for, its path and query parameters are part of the ETag.
+    :param models: Every model the response depends on.
+    :param variant: Anything else the response depends on, like the negotiated media type.
+
+    :returns: ETag and Last-Modified headers for the response.
+    """
+
+    versions, last_modified = get_versions(models)
+    digest = md5(f"{request.get_full_path()}|{variant}|{versions}".encode(), usedforsecurity=False).hexdigest()
+    return {'ETag': quote_etag(digest), 'Last-Modified': http_date(last_modified)}
+
+
+def not_modified(request: HttpRequest, headers: dict[str, str]) -> Optional[HttpResponse]:
+    """
+    Evaluate If-None-Match/If-Modified-Since (and If-Match/If-Unmodified-Since) against the headers of the response.
+
+    :returns: A 304 (or 412) response when the client's copy is still valid, None when the response must be generated.
+    """
+
+    response = HttpResponse(headers=headers)  # Lets Django copy our headers onto the 304 response.
+    last_modified = parse_http_date(headers['Last-Modified'])
+    conditional = get_conditional_response(request, etag=headers['ETag'], last_modified=last_modified, response=response)
+    return None if conditional is response else conditional
+
+
+def _on_change(model: Type[Model], action: str, pks: tuple) -> None:
+    bump_version(model)
+
+
+connect_listener(_on_change)
@@ -3,77 +3,152 @@
 
 
 from enum import Enum
-from itertools import chain
+from functools import lru_cache, cache
+from django.conf import settings
+from itertools import chain, count, islice
 from django.urls import path
-from typing import Type, Iterable
+from typing import Type, Iterable, Optional, Callable, Awaitable, Union
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from django.shortcuts import render
+from django.http import HttpResponseBase
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 from drf_writable_nested import WritableNestedModelSerializer
 from rest_framework.serializers import ModelSerializer, ListSerializer
+from rest_framework.exceptions import ValidationError
+from django.db import transaction, connections, IntegrityError
 from django.db.models import Model, QuerySet, ForeignKey
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models.fields.related_descriptors import ReverseManyToOneDescriptor, ReverseOneToOneDescriptor, \
     ManyToManyDescriptor
 
+from .shapes import Shape, parse_shape
+from .query_plan import QueryPlan
+from .versions import version_headers, not_modified
+from .response_cache import response_key, get_response, tag_versions, list_tags, detail_tags, cache_response, statistics
+from .signals import CREATED, UPDATED, notify_changed, track_models, related_models
+from .changes import log_changes, logged_models, changes_since, horizon, head
+from .updates import PartialUpdateSerializer
+from .references import REFERENCES_CONTEXT, ResolvedPrimaryKeyRelatedField, resolve_references
+from .renderers import StreamingJSONRenderer, NDJSONRenderer, ColumnarJSONRenderer, CSVRenderer, OPTIONAL_RENDERERS
+from .flat import serialize_list, serialize_object
+from .streaming import serialized_chunks, streaming_response, _DEFAULT_CHUNK_SIZE
+from .filters import filter_queryset, order_queryset
+from .aggregates import parse_aggregation, aggregate_queryset
+from .single_flight import flight_key, single_flight, asingle_flight
+from .imports import parse_rows, validate_rows, importer
+from .upserts import ON_CONFLICT, UPDATE, ERROR, UPSERT_HEADER, conflict_fields, without_unique_validators, key_of, upsert, \
+    unique_errors
+from .pagination import Pagination, TotalCount, paginate, count_headers, acount_headers, estimated_count, _get_limit, \
+    _DEFAULT_PAGE_SIZE
+from .costs import Budget, OverBudget, COST_HEADER, DECISION_HEADER, ACCEPTED, DOWNGRADED, MINIMUM, MATERIALIZED, \
+    LIST, DETAIL, AGGREGATE, WRITE, EXPORT, default_budget, estimate, timed, timed_iterator
+from .documents import materialize
+from .async_views import async_api_view, aserialize_list, aserialize_object, asave
+
 _LIST_SUFFIX = '-list'
 _DETAIL_SUFFIX = '-detail'
 _CREATE_SUFFIX = '-create'
 _UPDATE_SUFFIX = '-update'
 _DELETE_SUFFIX = '-delete'
 _INSPECT_SUFFIX = '-inspect'
+_BULK_CREATE_SUFFIX = '-create-bulk'
+_BULK_UPDATE_SUFFIX = '-update-bulk'
+_BULK_DELETE_SUFFIX = '-delete-bulk'
+_AGGREGATE_SUFFIX = '-aggregate'
+_EXPORT_SUFFIX = '-export'
+_IMPORT_SUFFIX = '-import'
 
 _DEFAULT_DEPTH = 2  # Default serialization depth.
 _MAXIMUM_DEPTH = 10
 assert _DEFAULT_DEPTH < _MAXIMUM_DEPTH
+_DEFAULT_BULK_BATCH_SIZE = 1000  # Objects per INSERT/UPDATE/DELETE statement issued by bulk views.
+_SHAPED_SERIALIZER_CACHE_SIZE = 64  # Distinct ?fields=/?expand= combinations kept per model.
+
+# Renderers offered by list views, those implementing render_stream() may be used for streaming responses.
+_LIST_RENDERERS = (StreamingJSONRenderer, BrowsableAPIRenderer, NDJSONRenderer, ColumnarJSONRenderer, *OPTIONAL_RENDERERS)
+_DETAIL_RENDERERS = (JSONRenderer, BrowsableAPIRenderer, *OPTIONAL_RENDERERS)
+_EXPORT_RENDERERS = (NDJSONRenderer, CSVRenderer)
+
+
+def _serializable_field_names(crud_model: Type[Model], field_exclude: Iterable[str] = ()) -> list[str]:
+    """ Names of the fields and related sets generic serializers include for the model. """
+
+    # TODO kevin: hasattr() is a bit of a dirty fix
+    return [field.name for field in chain(crud_model._meta.fields, crud_model._meta.related_objects) if field.name not in field_exclude and hasattr(crud_model, field.name)]
 
 
 def generic_serializer(crud_model: Type[Model], depth_limit: int = 0, field_exclude: Iterable[str] = ()) -> Type[WritableNestedModelSerializer]:
     """
-    Creates a Generic recursive ModelSerializer for the provided model
+    Creates a Generic recursive ModelSerializer for the provided model.
+    Classes are memoized, so identical subtrees of nested serializers share a single class.
 
     :param crud_model: Model subclass for which a serializer should be created.
     :param depth_limit: Maximum relation depth, below which objects won't be nested.
     :param field_exclude: List of field names to be excluded from serialization.
 
-    :returns: The new ModelSerializer class.
+    :returns: The new ModelSerializer class, with a matching QueryPlan in its 'query_plan' attribute,
+        and the models it reads in its 'dependencies' attribute.
     """
 
+    return _generic_serializer(crud_model, depth_limit, frozenset(field_exclude))
+
+
+@cache
+def _generic_serializer(crud_model: Type[Model], depth_limit: int, field_exclude: frozenset[str]) -> Type[WritableNestedModelSerializer]:
+    """ Memoized implementation of generic_serializer(), field_exclude must be hashable. """
+
+    related_sets: dict[str, ModelSerializer] = {}
+    query_plan = QueryPlan()  # Fetch everything the nested serializers need up front, rather than once per object.
+    dependencies = {crud_model}  # Models whose changes may alter the serialized output.
     if depth_limit > 0:  # We may create serializers for related sets...
-        # Generate a dictionary where keys are foreign key fields or related set field names, and values are serializers
-        related_sets: dict[str, Type[ModelSerializer]] = {  # Serialize related sets, and disallow the related model from going back through the ForeignKey
-            rel.related_name: generic_serializer(rel.related_model, depth_limit-1, {rel.remote_field.name})(many=True)
+        # Serialize related sets, and disallow the related model from going back through the ForeignKey
+        for rel in crud_model._meta.related_objects:
             # TODO Kevin: Not sure why we get a related set with None name
-            for rel in crud_model._meta.related_objects if rel.name not in field_exclude and rel.related_name is not None
-        } | {  # Serialize ForeignKey, and disallow the related model from going back through the related set
-            field.name: generic_serializer(field.related_model, depth_limit-1, {field.remote_field.name})(many=False)
-            for field in crud_model._meta.fields if isinstance(field, ForeignKey) and field.name not in field_exclude
-        }
-    else:
-        related_sets = {}
+            if rel.name not in field_exclude and rel.related_name is not None:
+                RelatedSerializer = generic_serializer(rel.related_model, depth_limit-1, {rel.remote_field.name})
+                related_sets[rel.related_name] = RelatedSerializer(many=True)
+                query_plan |= RelatedSerializer.query_plan.prefetched(rel.get_accessor_name(), rel.related_model)
+                dependencies |= RelatedSerializer.dependencies
+
+        # Serialize ForeignKey, and disallow the related model from going back through the related set
+        for field in crud_model._meta.fields:
+            if isinstance(field, ForeignKey) and field.name not in field_exclude:
+                RelatedSerializer = generic_serializer(field.related_model, depth_limit-1, {field.remote_field.name})
+                related_sets[field.name] = RelatedSerializer(many=False)
+                query_plan |= RelatedSerializer.query_plan.selected(field.name)
+                dependencies |= RelatedSerializer.dependencies
+    else:  # Related sets are still serialized as lists of primary keys, which would otherwise cost a query per object.
+        for rel in crud_model._meta.related_objects:
+            if rel.name not in field_exclude and hasattr(crud_model, rel.name):
+                query_plan |= QueryPlan().prefetched(rel.get_accessor_name(), rel.related_model)
+                dependencies.add(rel.related_model)
 
     # TODO Kevin: Updating the cards of a cardlist will delete cards that are absent from the received JSON.
-    #   This is probably not desired.
+    #   This is probably not desired. PATCH leaves absent related sets alone, POST still replaces them.
 
     def to_internal_value(self: WritableNestedModelSerializer, data: dict):
         assert isinstance(data, dict)
-        for fieldname, fieldvalue in data.items():
-            if isinstance(fieldvalue, (int, list)) and isinstance(serfield := self.fields[fieldname], ModelSerializer):
-                if isinstance(serfield, ListSerializer):  # TODO Kevin: Haven't tested if checking on ListSerializer works
-                    data[fieldname] = type(serfield)(serfield.Meta.model.objects.filter(pk__in=fieldvalue), many=True).data
-                else:
-                    data[fieldname] = type(serfield)(serfield.Meta.model.objects.get(pk=fieldvalue), many=False).data
+        if REFERENCES_CONTEXT not in self.context:  # The first serializer to see the payload resolves references in all of it.
+            if isinstance(self.root, ListSerializer) and isinstance(self.root.initial_data, list):
+                self.context[REFERENCES_CONTEXT] = resolve_references(self.root.child, self.root.initial_data)
+            else:
+                self.context[REFERENCES_CONTEXT] = resolve_references(self, [data])
         return super(WritableNestedModelSerializer, self).to_internal_value(data)
 
     # Create the class using the 'type' function, to allow setting custom serializers for related sets
-    GenericSerializer = type('GenericSerializer', (WritableNestedModelSerializer,), {
+    GenericSerializer = type('GenericSerializer', (PartialUpdateSerializer,), {
         **related_sets,
+        'query_plan': query_plan,
+        'dependencies': frozenset(dependencies),
         'to_internal_value': to_internal_value,
+        'serializer_related_field': ResolvedPrimaryKeyRelatedField,
         'Meta': type('Meta', (), {
             "model": crud_model,
-            # TODO kevin: hasattr() is a bit of a dirty fix
-            "fields": [field.name for field in chain(crud_model._meta.fields, crud_model._meta.related_objects) if field.name not in field_exclude and hasattr(crud_model, field.name)],
+            "fields": _serializable_field_names(crud_model, field_exclude),
             "depth": depth_limit if related_sets else 0,  # We basically ignore depth, when we generate the classes ourselves ¯\_(ツ)_/¯
         })
     })
@@ -81,6 +156,62 @@ def generic_serializer(crud_model: Type[Model], depth_limit: int = 0, field_excl
     return GenericSerializer
 
 
+def shaped_serializer(crud_model: Type[Model], shape: Shape, field_exclude: Iterable[str] = ()) -> Type[WritableNestedModelSerializer]:
+    """
+    Creates a read-only variant of generic_serializer(), which only includes and nests what the shape asks for.
+    The attached QueryPlan only loads the columns and joins the relations that are actually serialized.
+
+    :param crud_model: Model subclass for which a serializer should be created.
+    :param shape: Fields to include and relations to expand, as parsed from ?fields= and ?expand=.
+    :param field_exclude: List of field names to be excluded from serialization.
+
+    :returns: The new ModelSerializer class, with a matching QueryPlan in its 'query_plan' attribute,
+        and the models it reads in its 'dependencies' attribute.
+    """
+
+    available = _serializable_field_names(crud_model, field_exclude)
+    if shape.fields is not None and (unknown := shape.fields - set(available)):
+        raise ValidationError({'fields': [f"{crud_model.__name__} has no field(s): {', '.join(sorted(unknown))}."]})
+    fields = available if shape.fields is None else [name for name in available if name in shape.fields]
+
+    related_sets: dict[str, ModelSerializer] = {}
+    query_plan = QueryPlan(only=tuple(name for name in fields if crud_model._meta.get_field(name).concrete))
+    dependencies = {crud_model}
+    for name, nested_shape in shape.expand:
+        field = crud_model._meta.get_field(name) if name in available else None
+        if isinstance(field, ForeignKey):
+            RelatedSerializer = shaped_serializer(field.related_model, nested_shape, {field.remote_field.name})
+            related_sets[name] = RelatedSerializer(many=False)
+            query_plan |= RelatedSerializer.query_plan.selected(name)
+            dependencies |= RelatedSerializer.dependencies
+        elif field is not None and field.auto_created and not field.concrete:  # Related set
+            RelatedSerializer = shaped_serializer(field.related_model, nested_shape, {field.remote_field.name})
+            related_sets[name] = RelatedSerializer(many=True)
+            # Reverse ForeignKeys must load the key back to us, or the prefetched objects can't be matched with ours.
+            required = (field.remote_field.name,) if field.one_to_many or field.one_to_one else ()
+            query_plan |= RelatedSerializer.query_plan.prefetched(field.get_accessor_name(), field.related_model, required)
+            dependencies |= RelatedSerializer.dependencies
+        else:
+            raise ValidationError({'expand': [f"{crud_model.__name__}.{name} is not a relation which can be expanded."]})
+
+    for name in fields:  # Unexpanded related sets are serialized as lists of primary keys.
+        field = crud_model._meta.get_field(name)
+        if name not in related_sets and field.auto_created and not field.concrete:
+            query_plan |= QueryPlan().prefetched(field.get_accessor_name(), field.related_model)
+            dependencies.add(field.related_model)
+
+    return type('ShapedSerializer', (WritableNestedModelSerializer,), {
+        **related_sets,
+        'query_plan': query_plan,
+        'dependencies': frozenset(dependencies),
+        'Meta': type('Meta', (), {
+            "model": crud_model,
+            "fields": fields,
+            "depth": 0,
+        })
+    })
+
+
 class CrudOps(Enum):
     CREATE = 0
     LIST = 1
@@ -88,66 +219,549 @@ class CrudOps(Enum):
     UPDATE = 3
     DELETE = 4
     MODEL = 5
-
-
-def generic_crud(crud_model: Type[Model], exclude: Iterable[CrudOps] = None) -> Iterable[path]:
+    BULK = 6
+    AGGREGATE = 7
+    EXPORT = 8
+    IMPORT = 9
+
+
+def generic_crud(crud_model: Type[Model], exclude: Iterable[CrudOps] = None,
+                 pagination: Pagination = Pagination.NONE, page_size: int = _DEFAULT_PAGE_SIZE,
+                 total_count: TotalCount = TotalCount.NONE,
+                 streaming: bool = False, stream_chunk_size: int = _DEFAULT_CHUNK_SIZE,
+                 bulk_batch_size: int = _DEFAULT_BULK_BATCH_SIZE, conditional: bool = True,
+                 cache_timeout: Optional[int] = None, unindexed_filters: Iterable[str] = (),
+                 asynchronous: Optional[bool] = None, query_budget: Optional[Budget] = None,
+                 over_budget: OverBudget = OverBudget.DOWNGRADE, coalesce_reads: Optional[bool] = None,
+                 materialized_depths: Iterable[int] = ()) -> Iterable[path]:
     """
     Creates generic CRUD views for the specified model
 
     :param crud_model: Model to create web API CRUD operations for
     :param exclude: CRUD operations to exclude.
+    :param pagination: How the list view should be paginated (?after=<pk>&limit= or ?offset=&limit=).
+    :param page_size: Number of objects per page, when the client doesn't specify ?limit=.
+    :param total_count: Whether the list view should report the total number of objects in the X-Total-Count header.
+    :param streaming: Whether the list view should be written one chunk at a time, as a JSON array or NDJSON.
+    :param stream_chunk_size: Number of objects fetched and serialized at a time, when streaming or exporting.
+    :param bulk_batch_size: Maximum number of objects written per query by the bulk views.
+    :param conditional: Whether the list and detail views should send ETags, and answer conditional requests with 304.
+    :param cache_timeout: Seconds to keep rendered list and detail responses in the response cache, None disables it.
+        Cached responses are invalidated as soon as any model they depend on is written to.
+    :param unindexed_filters: Fields the list view may filter and order by, even though they aren't indexed.
+    :param asynchronous: Whether the list, detail, create, update and delete views should be coroutines,
+        which don't hold a thread while waiting on the database under ASGI. None uses settings.API_ASYNC_VIEWS.
+        Async list views don't stream, as Django only streams async iterators from version 4.2.
+    :param query_budget: Most a single list or detail read may cost, as estimated before its queries run.
+        None uses settings.API_QUERY_BUDGET.
+    :param over_budget: Whether reads deeper than the budget allows should be served at a smaller ?depth=, or rejected.
+    :param coalesce_reads: Whether identical list, detail and aggregate reads in flight at the same time should be evaluated
+        only once, sharing the rendered response. None uses settings.API_COALESCE_READS.
+    :param materialized_depths: Depths whose serialized objects should be stored as documents, which list and detail reads
+        at that ?depth= (without ?fields= or ?expand=) are served from. Documents are refreshed once writes to the objects
+        they hold commit.
 
     :returns: A tuple of path() instances to be inserted into your app's urlpatterns
     """
 
-    generic_serializers = {_DEFAULT_DEPTH: generic_serializer(crud_model, _DEFAULT_DEPTH)}
+    # Nested serializers may reach any related model, so writes to all of them must be tracked.
+    track_models(related_models(crud_model))
+    log_changes(crud_model)
 
-    def _get_or_create_serializer(request: Request) -> Type[ModelSerializer]:
-        """ Create a new serializer class for the specified depth if required. """
+    # settings.API_WARMUP_DEPTHS lets us build deeper serializers up front, rather than on the first request for them.
+    warmup_depths = {_DEFAULT_DEPTH, *(min(depth, _MAXIMUM_DEPTH) for depth in getattr(settings, 'API_WARMUP_DEPTHS', ()))}
+    generic_serializers = {depth: generic_serializer(crud_model, depth) for depth in warmup_depths}
+    # Documents of the materialized depths, by their generic serializer.
+    materializations = {}
+    for depth in {min(depth, _MAXIMUM_DEPTH) for depth in materialized_depths}:
+        generic_serializers[depth] = generic_serializer(crud_model, depth)
+        materializations[generic_serializers[depth]] = materialize(generic_serializers[depth], depth)
 
+    def _get_depth(request: Request) -> int:
         try:
             depth = int(request.GET.get('depth', _DEFAULT_DEPTH))
             if depth > _MAXIMUM_DEPTH:
                 depth = _MAXIMUM_DEPTH
         except ValueError:
             depth = _DEFAULT_DEPTH
+        return depth
 
+    def _get_or_create_serializer(request: Request, depth: Optional[int] = None) -> Type[ModelSerializer]:
+        """ Create a new serializer class for the specified depth if required. """
+
+        if depth is None:
+            depth = _get_depth(request)
         if depth not in generic_serializers:
             generic_serializers[depth] = generic_serializer(crud_model, depth)
         return generic_serializers[depth]
 
+    # Clients may ask for any combination of fields, so unlike the depths above, these have to be evicted eventually.
+    _get_or_create_shaped_serializer = lru_cache(maxsize=_SHAPED_SERIALIZER_CACHE_SIZE)(
+        lambda shape: shaped_serializer(crud_model, shape))
+
+    def _get_or_create_read_serializer(request: Request) -> Type[ModelSerializer]:
+        """ Like _get_or_create_serializer(), but narrowed to ?fields= and ?expand= when present. """
+
+        if 'fields' not in request.GET and 'expand' not in request.GET:
+            return _get_or_create_serializer(request)
+        return _get_or_create_shaped_serializer(parse_shape(request.GET.get('fields'), request.GET.get('expand'), _MAXIMUM_DEPTH))
+
+    def _budgeted_read_serializer(request: Request, rows: Optional[int]) -> tuple[Type[ModelSerializer], dict[str, str]]:
+        """
+        _get_or_create_read_serializer(), once its estimated cost is found to be within the budget.
+        Reads over budget are served at the deepest ?depth= within it, or rejected, but never below depth 0.
+        Lists over budget even then must be paginated or filtered, ?expand= over budget is always rejected.
+
+        :param rows: Number of objects to serialize, None for every object of the model.
+
+        :returns: The serializer, and headers reporting its estimated cost and what was decided.
+        """
+
+        budget = query_budget or default_budget()
+        serializer_class = _get_or_create_read_serializer(request)
+        if serializer_class in materializations:
+            return serializer_class, {COST_HEADER: str(materializations[serializer_class].cost(rows)), DECISION_HEADER: MATERIALIZED}
+        if (cost := estimate(serializer_class, rows)).within(budget):
+            return serializer_class, {COST_HEADER: str(cost), DECISION_HEADER: ACCEPTED}
+
+        shaped = 'fields' in request.GET or 'expand' in request.GET
+        depth = 0 if shaped else max(_get_depth(request), 0)
+        if shaped and request.GET.get('expand') or over_budget is OverBudget.REJECT and depth > 0:
+            parameter = 'expand' if shaped else 'depth'
+            raise ValidationError({parameter: [f"The estimated cost ({cost}) exceeds the budget "
+                                               f"(queries={budget.queries}, rows={budget.rows}), ask for less."]})
+        if depth == 0:
+            return serializer_class, {COST_HEADER: str(cost), DECISION_HEADER: MINIMUM}
+
+        # Each level multiplies the cost, so find the deepest one within the budget from the bottom up.
+        fitting, fitting_cost = 0, estimate(_get_or_create_serializer(request, 0), rows)
+        for smaller in range(1, depth):
+            if not (smaller_cost := estimate(_get_or_create_serializer(request, smaller), rows)).within(budget):
+                break
+            fitting, fitting_cost = smaller, smaller_cost
+        return _get_or_create_serializer(request, fitting), {
+            COST_HEADER: str(fitting_cost), DECISION_HEADER: f"{DOWNGRADED}; depth={fitting}"}
+
+    def _list_rows(request: Request) -> Optional[int]:
+        """ Number of objects the list view may serialize, None for every object of the model. """
+
+        rows = None if pagination is Pagination.NONE else _get_limit(request, page_size)
+        instances = filter_queryset(request, crud_model.objects.all(), unindexed_filters)
+        if instances.query.where and connections[instances.db].vendor == 'postgresql':
+            # Filters narrow the list down, by as much as the planner expects, without running the query.
+            filtered = estimated_count(instances)
+            rows = filtered if rows is None else min(rows, filtered)
+        return rows
+
+    def _version_headers(request: Request, serializer_class: Type[ModelSerializer]) -> dict[str, str]:
+        """ ETag and Last-Modified for a read view, computed from model versions alone, so before any query is made. """
+
+        if not conditional:
+            return {}
+        return version_headers(request, serializer_class.dependencies, request.accepted_media_type)
+
+    def _response_cache_key(request: Request) -> Optional[str]:
+        """ Key of the response in the response cache, or None if it shouldn't be cached. """
+
+        if cache_timeout is None or isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return None
+        return response_key(crud_model, request)
+
+    def _cached_read(request: Request, serializer_class: Type[ModelSerializer], tags: Callable[[], set[str]],
+                     cacheable: bool = True) -> tuple[Optional[HttpResponseBase], dict[str, str], Optional[str], Optional[dict]]:
+        """
+        Answer a read view from the client's copy or the response cache, when either is still valid.
+
+        :returns: The response if it could be answered, otherwise None.
+            Followed by the headers, response cache key and tag versions to build the response with.
+        """
+
+        headers = _version_headers(request, serializer_class)
+        if headers and (response := not_modified(request, headers)):
+            return response, headers, None, None
+
+        cache_key = _response_cache_key(request) if cacheable else None
+        if cache_key and (response := get_response(crud_model, cache_key, headers)):
+            return response, headers, None, None
+        return None, headers, cache_key, tag_versions(tags()) if cache_key else None
+
+    def _read_response(request: Request, data: Union[list, dict], headers: dict[str, str], cache_key: Optional[str],
+                       versions: Optional[dict]) -> HttpResponseBase:
+        if cache_key:
+            return cache_response(cache_key, versions, request, data, headers, cache_timeout)
+        return Response(data, headers=headers)
+
+    if coalesce_reads is None:
+        coalesce_reads = getattr(settings, 'API_COALESCE_READS', True)
+
+    def _coalesced(request: Request, endpoint: str, dependencies: Iterable[Type[Model]], headers: dict[str, str],
+                   evaluate: Callable[[], HttpResponseBase]) -> HttpResponseBase:
+        """ Evaluate a read once for every identical request in flight at the same time, which share its response. """
+
+        if not coalesce_reads or isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return evaluate()  # The browsable API can only be rendered by DRF itself.
+        return single_flight(flight_key(crud_model, request, headers, dependencies), request, evaluate, endpoint)
+
+    async def _acoalesced(request: Request, endpoint: str, dependencies: Iterable[Type[Model]], headers: dict[str, str],
+                          evaluate: Callable[[], Awaitable[HttpResponseBase]]) -> HttpResponseBase:
+        if not coalesce_reads or isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return await evaluate()
+        return await asingle_flight(flight_key(crud_model, request, headers, dependencies), request, evaluate, endpoint)
+
+    def _list_queryset(request: Request) -> QuerySet:
+        """ The unpaginated objects of the list view, filtered and ordered by the query parameters. """
+
+        instances = filter_queryset(request, crud_model.objects.all(), unindexed_filters)
+        if 'ordering' in request.GET and pagination is Pagination.KEYSET:
+            raise ValidationError({'ordering': ['Keyset pagination always orders by primary key.']})
+        return order_queryset(request, instances, unindexed_filters)
+
     @api_view(['GET'])
+    @renderer_classes(_LIST_RENDERERS)
+    @timed(LIST)
     def generic_get_list(request: Request):
-        instances = crud_model.objects.all()
-        serializer = _get_or_create_serializer(request)(instances, many=True)
-        return Response(serializer.data)
+        # A downgraded serializer depends on fewer models than the one asked for, whose versions and tags cover it.
+        requested_class = _get_or_create_read_serializer(request)
+        stream = streaming and hasattr(request.accepted_renderer, 'render_stream')
+        # Streamed responses are never held in memory, so they can't be cached.
+        response, headers, cache_key, versions = _cached_read(request, requested_class, lambda: list_tags(requested_class), not stream)
+        if response:
+            return response
+
+        def evaluate() -> HttpResponseBase:
+            # Only estimated once the response must be built, 304s and cached responses don't ask the planner.
+            serializer_class, cost_headers = _budgeted_read_serializer(request, _list_rows(request))
+            documents = materializations.get(serializer_class)
+            instances = _list_queryset(request)
+            list_headers = headers | count_headers(instances, total_count) | cost_headers
+            page, page_headers = paginate(request, instances, pagination, page_size)
+            if stream:
+                chunks = documents.serialized_chunks(page, stream_chunk_size) if documents \
+                    else serialized_chunks(serializer_class, page, stream_chunk_size)
+                return streaming_response(request.accepted_renderer, timed_iterator(LIST, chunks), list_headers | page_headers)
+            data = documents.serialize_list(page) if documents else serialize_list(serializer_class, page)
+            return _read_response(request, data, list_headers | page_headers, cache_key, versions)
+
+        return evaluate() if stream else _coalesced(request, LIST, requested_class.dependencies, headers, evaluate)
 
     @api_view(['GET'])
+    @renderer_classes(_DETAIL_RENDERERS)
+    @timed(DETAIL)
     def generic_get_detail(request: Request, pk: int):
-        instance = crud_model.objects.get(pk=pk)
-        serializer = _get_or_create_serializer(request)(instance, many=False)
-        return Response(serializer.data)
+        requested_class = _get_or_create_read_serializer(request)
+        response, headers, cache_key, versions = _cached_read(request, requested_class, lambda: detail_tags(requested_class, pk))
+        if response:
+            return response
+
+        def evaluate() -> HttpResponseBase:
+            serializer_class, cost_headers = _budgeted_read_serializer(request, 1)
+            if (documents := materializations.get(serializer_class)) is not None:
+                data = documents.serialize_object(pk)
+            else:
+                data = serialize_object(serializer_class, crud_model.objects.all(), pk=pk)
+            return _read_response(request, data, headers | cost_headers, cache_key, versions)
+
+        return _coalesced(request, DETAIL, requested_class.dependencies, headers, evaluate)
+
+    def _on_conflict(request: Request) -> Optional[str]:
+        """ ?on_conflict=update or ignore of the create views, None unless an upsert was asked for. """
+
+        on_conflict = request.GET.get('on_conflict', ERROR)
+        if on_conflict not in ON_CONFLICT:
+            raise ValidationError({'on_conflict': [f"Expected one of: {', '.join(ON_CONFLICT)}."]})
+        if on_conflict == ERROR:
+            return None
+        if not conflict_fields(crud_model):
+            raise ValidationError({'on_conflict': [f"{crud_model.__name__} has no unique fields to detect conflicts with."]})
+        return on_conflict
+
+    def _upsert_object(request: Request, on_conflict: str) -> Response:
+        """
+        Create the object, or update (or leave) the one with the same unique_together (or unique) values.
+        Related sets can't be written this way, the result is reported by status (201 when created) and X-Upsert-Result.
+        """
+
+        serializer = without_unique_validators(bulk_serializer_class(data=request.data))
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            outcome = upsert(crud_model, [crud_model(**serializer.validated_data)], on_conflict, bulk_batch_size)
+        result, (instance,) = next((result, instances) for result, instances in outcome.items() if instances)
+        data = serialize_object(_get_or_create_serializer(request), crud_model.objects.all(), pk=instance.pk)
+        return Response(data, status=status.HTTP_201_CREATED if result == CREATED else status.HTTP_200_OK,
+                        headers={UPSERT_HEADER: result})
 
     @api_view(['POST'])
+    @timed(WRITE)
     def generic_create(request: Request):
+        """ With ?on_conflict=update or ignore, an existing object with the same unique values is updated or left alone. """
+
+        if on_conflict := _on_conflict(request):
+            return _upsert_object(request, on_conflict)
         serializer = _get_or_create_serializer(request)(data=request.data)
         if serializer.is_valid(raise_exception=True):
             serializer.save()
         return Response(serializer.data)
 
-    @api_view(['POST'])
+    @api_view(['POST', 'PATCH'])
+    @timed(WRITE)
     def generic_update(request: Request, pk: int):
+        """ POST replaces the object, PATCH only writes the fields present, and only if their values changed. """
+
         instance = crud_model.objects.get(pk=pk)
-        serializer = _get_or_create_serializer(request)(instance=instance, data=request.data)
+        serializer = _get_or_create_serializer(request)(instance=instance, data=request.data, partial=request.method == 'PATCH')
         if serializer.is_valid(raise_exception=True):
             serializer.save()
         return Response(serializer.data)
 
     @api_view(['DELETE'])
+    @timed(WRITE)
     def generic_delete(request: Request, pk: int):
         crud_model.objects.filter(pk=pk).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @async_api_view(['GET'])
+    @renderer_classes(_LIST_RENDERERS)
+    @timed(LIST)
+    async def async_get_list(request: Request):
+        requested_class = _get_or_create_read_serializer(request)
+        response, headers, cache_key, versions = _cached_read(request, requested_class, lambda: list_tags(requested_class))
+        if response:
+            return response
+
+        async def evaluate() -> HttpResponseBase:
+            serializer_class, cost_headers = await sync_to_async(lambda: _budgeted_read_serializer(request, _list_rows(request)))()
+            instances = _list_queryset(request)
+            list_headers = headers | await acount_headers(instances, total_count) | cost_headers
+            page, page_headers = await sync_to_async(paginate)(request, instances, pagination, page_size)
+            if (documents := materializations.get(serializer_class)) is not None:
+                data = await sync_to_async(documents.serialize_list)(page)
+            else:
+                data = await aserialize_list(serializer_class, page)
+            return _read_response(request, data, list_headers | page_headers, cache_key, versions)
+
+        return await _acoalesced(request, LIST, requested_class.dependencies, headers, evaluate)
+
+    @async_api_view(['GET'])
+    @renderer_classes(_DETAIL_RENDERERS)
+    @timed(DETAIL)
+    async def async_get_detail(request: Request, pk: int):
+        requested_class = _get_or_create_read_serializer(request)
+        response, headers, cache_key, versions = _cached_read(request, requested_class, lambda: detail_tags(requested_class, pk))
+        if response:
+            return response
+
+        async def evaluate() -> HttpResponseBase:
+            serializer_class, cost_headers = await sync_to_async(_budgeted_read_serializer)(request, 1)
+            if (documents := materializations.get(serializer_class)) is not None:
+                data = await sync_to_async(documents.serialize_object)(pk)
+            else:
+                data = await aserialize_object(serializer_class, crud_model.objects.all(), pk=pk)
+            return _read_response(request, data, headers | cost_headers, cache_key, versions)
+
+        return await _acoalesced(request, DETAIL, requested_class.dependencies, headers, evaluate)
+
+    @async_api_view(['POST'])
+    @timed(WRITE)
+    async def async_create(request: Request):
+        if on_conflict := _on_conflict(request):
+            return await sync_to_async(_upsert_object)(request, on_conflict)
+        return Response(await asave(_get_or_create_serializer(request)(data=request.data)))
+
+    @async_api_view(['POST', 'PATCH'])
+    @timed(WRITE)
+    async def async_update(request: Request, pk: int):
+        instance = await crud_model.objects.aget(pk=pk)
+        serializer = _get_or_create_serializer(request)(instance=instance, data=request.data, partial=request.method == 'PATCH')
+        return Response(await asave(serializer))
+
+    @async_api_view(['DELETE'])
+    @timed(WRITE)
+    async def async_delete(request: Request, pk: int):
+        await crud_model.objects.filter(pk=pk).adelete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if asynchronous is None:
+        asynchronous = getattr(settings, 'API_ASYNC_VIEWS', False)
+    if asynchronous:
+        get_list, get_detail, create, update, delete = async_get_list, async_get_detail, async_create, async_update, async_delete
+    else:
+        get_list, get_detail, create, update, delete = generic_get_list, generic_get_detail, generic_create, generic_update, generic_delete
+
+    # Bulk views only write the model's own columns, related sets can't be written with bulk_create()/bulk_update().
+    bulk_serializer_class = generic_serializer(crud_model, 0, {rel.name for rel in crud_model._meta.related_objects})
+    pk_name = crud_model._meta.pk.name
+
+    def _bulk_items(request: Request) -> list[dict]:
+        if not isinstance(request.data, list) or not all(isinstance(item, dict) for item in request.data):
+            raise ValidationError({'non_field_errors': ['Expected a list of objects.']})
+        return request.data
+
+    def _bulk_pk(value) -> object:
+        try:
+            return crud_model._meta.pk.to_python(value)
+        except DjangoValidationError:
+            return None
+
+    @api_view(['POST'])
+    @timed(WRITE)
+    def generic_bulk_create(request: Request):
+        """
+        Create all objects in the received list, or none of them if any are invalid.
+        With ?on_conflict=update or ignore, objects with the unique values of existing ones update them or are left alone,
+        and the objects are returned as {"created": [...], "updated": [...], "unchanged": [...]}.
+        """
+
+        on_conflict = _on_conflict(request)
+        # Uniqueness is checked for the whole list at once below, rather than with a query per item.
+        serializer = without_unique_validators(bulk_serializer_class(data=_bulk_items(request), many=True))
+        if not serializer.is_valid():  # Errors are reported per item, in the order they were received.
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        instances = [crud_model(**data) for data in serializer.validated_data]
+        if on_conflict:
+            key_fields = conflict_fields(crud_model)
+            first: dict[tuple, int] = {}  # Index of the first item with each key.
+            errors = [{} if first.setdefault(key_of(instance, key_fields), index) == index else
+                      {'non_field_errors': [f"Identifies the same object as item {first[key_of(instance, key_fields)]}."]}
+                      for index, instance in enumerate(instances)]
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                outcome = upsert(crud_model, instances, on_conflict, bulk_batch_size)
+            return Response({result: bulk_serializer_class(objects, many=True).data for result, objects in outcome.items()},
+                            status=status.HTTP_201_CREATED if outcome[CREATED] else status.HTTP_200_OK)
+
+        if any(errors := unique_errors(crud_model, instances, bulk_batch_size)):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            instances = crud_model.objects.bulk_create(instances, batch_size=bulk_batch_size)
+            notify_changed(crud_model, CREATED, [instance.pk for instance in instances])  # bulk_create() doesn't send post_save.
+        return Response(bulk_serializer_class(instances, many=True).data, status=status.HTTP_201_CREATED)
+
+    @api_view(['POST'])
+    @timed(WRITE)
+    def generic_bulk_update(request: Request):
+        """ Update the fields present in each received object, identified by its primary key. """
+
+        items = _bulk_items(request)
+        pks = [_bulk_pk(item.get(pk_name, item.get('pk'))) for item in items]
+        instances = crud_model.objects.in_bulk({pk for pk in pks if pk is not None})
+
+        # Every item gets its own serializer, so they must share the references resolved for the whole payload.
+        context = {REFERENCES_CONTEXT: resolve_references(bulk_serializer_class(), items)}
+        errors: list[dict] = []
+        updated: list[Model] = []
+        updated_fields: set[str] = set()
+        for item, pk in zip(items, pks):
+            if (instance := instances.get(pk)) is None:
+                errors.append({pk_name: [f"{crud_model.__name__} with primary key '{item.get(pk_name, item.get('pk'))}' does not exist."]})
+                continue
+            # Uniqueness is checked for the whole list at once below, rather than with a query per item.
+            serializer = without_unique_validators(bulk_serializer_class(instance, data=item, partial=True, context=context))
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            errors.append({})
+            for fieldname, value in serializer.validated_data.items():
+                setattr(instance, fieldname, value)
+                updated_fields.add(fieldname)
+            updated.append(instance)
+
+        if not any(errors):  # Every item is valid on its own, so errors line up with the updated instances.
+            errors = unique_errors(crud_model, updated, bulk_batch_size, updated_fields)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            if updated_fields:
+                crud_model.objects.bulk_update(updated, sorted(updated_fields), batch_size=bulk_batch_size)
+                notify_changed(crud_model, UPDATED, [instance.pk for instance in updated])
+        return Response(bulk_serializer_class(updated, many=True).data)
+
+    @api_view(['POST', 'DELETE'])
+    @timed(WRITE)
+    def generic_bulk_delete(request: Request):
+        """ Delete the objects with the received list of primary keys. """
+
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of primary keys.']})
+        pks = [_bulk_pk(pk) for pk in request.data]
+        if None in pks:
+            return Response([{} if pk is not None else {pk_name: ['Invalid primary key.']} for pk in pks],
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        deleted = []
+        with transaction.atomic():
+            for start in range(0, len(pks), bulk_batch_size):
+                batch = list(crud_model.objects.filter(pk__in=pks[start:start + bulk_batch_size]).values_list('pk', flat=True))
+                crud_model.objects.filter(pk__in=batch).delete()
+                deleted += batch
+        deleted_set = set(deleted)
+        return Response({'deleted': deleted, 'not_found': [pk for pk in pks if pk not in deleted_set]})
+
+    @api_view(['GET'])
+    @renderer_classes(_LIST_RENDERERS)
+    @timed(AGGREGATE)
+    def generic_aggregate(request: Request):
+        """ Aggregate the (filtered) objects in the database, like ?group_by=team_course__course&aggregate=avg:grade,count """
+
+        lookups, aggregates, models = parse_aggregation(crud_model, request.GET.get('group_by'), request.GET.get('aggregate'))
+        headers = version_headers(request, models, request.accepted_media_type) if conditional else {}
+        if headers and (response := not_modified(request, headers)):
+            return response
+
+        instances = filter_queryset(request, crud_model.objects.all(), unindexed_filters)
+        return _coalesced(request, AGGREGATE, models, headers,
+                          lambda: Response(aggregate_queryset(instances, lookups, aggregates), headers=headers))
+
+    @api_view(['GET'])
+    @renderer_classes(_EXPORT_RENDERERS)
+    @timed(EXPORT)
+    def generic_export(request: Request):
+        """
+        Stream every (filtered) object as NDJSON, or as CSV with ?format=csv, from a server-side cursor.
+        Takes the same filters, ?ordering=, ?fields=, ?expand= and ?depth= as the list view, but is never paginated.
+        Like streamed lists, it must be served through WSGI until Django 4.2.
+        """
+
+        # Each chunk is serialized on its own, so the budget applies per chunk rather than to the whole export.
+        serializer_class, headers = _budgeted_read_serializer(request, stream_chunk_size)
+        instances = order_queryset(request, filter_queryset(request, crud_model.objects.all(), unindexed_filters), unindexed_filters)
+        if not instances.ordered:  # Exports of the same data should come out the same.
+            instances = instances.order_by('pk')
+        headers['Content-Disposition'] = f'attachment; filename="{model_name}.{request.accepted_renderer.format}"'
+        chunks = timed_iterator(EXPORT, serialized_chunks(serializer_class, instances, stream_chunk_size))
+        return streaming_response(request.accepted_renderer, chunks, headers)
+
+    @api_view(['POST'])
+    @timed(WRITE)
+    def generic_import(request: Request):
+        """
+        Create objects from a text/csv or application/x-ndjson body, which is read and validated bulk_batch_size rows at a time.
+        Rows with the unique_together (or unique) values of an existing object update it, unless ?on_conflict=ignore or error.
+        On PostgreSQL, rows are loaded with COPY into a staging table, and merged into the model's table at the end.
+        Either every row is imported, or none of them are.
+
+        :returns: The number of rows which created, updated and didn't change an object.
+            Otherwise the errors of the first chunk with invalid rows, by the index of their row.
+        """
+
+        on_conflict = request.GET.get('on_conflict', UPDATE)
+        if on_conflict not in ON_CONFLICT:
+            raise ValidationError({'on_conflict': [f"Expected one of: {', '.join(ON_CONFLICT)}."]})
+
+        rows = parse_rows(request._request)  # Read straight from the body, which DRF's parsers would read at once.
+        loader = importer(crud_model, on_conflict, bulk_batch_size)
+        try:
+            with transaction.atomic():
+                for offset in count(0, bulk_batch_size):
+                    if not (chunk := list(islice(rows, bulk_batch_size))):
+                        break
+                    loader.load(validate_rows(bulk_serializer_class, chunk, offset))
+                counts = loader.finish()
+        except IntegrityError as e:
+            return Response({'non_field_errors': [f"Rows conflict with existing objects: {e}"]}, status=status.HTTP_409_CONFLICT)
+        return Response(counts)
+
     @api_view(['GET'])
     def generic_inspect(request: Request):
         fieldlist_json = {
@@ -166,24 +780,85 @@ def generic_crud(crud_model: Type[Model], exclude: Iterable[CrudOps] = None) ->
     update_url = f"{model_name}{_UPDATE_SUFFIX}"
     delete_url = f"{model_name}{_DELETE_SUFFIX}"
     model_url = f"{model_name}"  # Inspect model structure.
+    bulk_create_url = f"{model_name}{_BULK_CREATE_SUFFIX}"
+    bulk_update_url = f"{model_name}{_BULK_UPDATE_SUFFIX}"
+    bulk_delete_url = f"{model_name}{_BULK_DELETE_SUFFIX}"
+    aggregate_url = f"{model_name}{_AGGREGATE_SUFFIX}"
+    export_url = f"{model_name}{_EXPORT_SUFFIX}"
+    import_url = f"{model_name}{_IMPORT_SUFFIX}"
 
     operations: list[path] = []
     if exclude is None or CrudOps.LIST not in exclude:
-        operations.append(path(f"{list_url}/", generic_get_list, name=f"api-{list_url}"))
+        operations.append(path(f"{list_url}/", get_list, name=f"api-{list_url}"))
     if exclude is None or CrudOps.DETAIL not in exclude:
-        operations.append(path(f"{detail_url}/<str:pk>/", generic_get_detail, name=f"api-{detail_url}"))
+        operations.append(path(f"{detail_url}/<str:pk>/", get_detail, name=f"api-{detail_url}"))
     if exclude is None or CrudOps.CREATE not in exclude:
-        operations.append(path(f"{create_url}/", generic_create, name=f"api-{create_url}"))
+        operations.append(path(f"{create_url}/", create, name=f"api-{create_url}"))
     if exclude is None or CrudOps.UPDATE not in exclude:
-        operations.append(path(f"{update_url}/<str:pk>/", generic_update, name=f"api-{update_url}"))
+        operations.append(path(f"{update_url}/<str:pk>/", update, name=f"api-{update_url}"))
     if exclude is None or CrudOps.DELETE not in exclude:
-        operations.append(path(f"{delete_url}/<str:pk>/", generic_delete, name=f"api-{delete_url}"))
+        operations.append(path(f"{delete_url}/<str:pk>/", delete, name=f"api-{delete_url}"))
     if exclude is None or CrudOps.MODEL not in exclude:
         operations.append(path(f"{model_url}/", generic_inspect, name=f"api-{model_url}-inspect"))
+    if exclude is None or CrudOps.BULK not in exclude:
+        operations.append(path(f"{bulk_create_url}/", generic_bulk_create, name=f"api-{bulk_create_url}"))
+        operations.append(path(f"{bulk_update_url}/", generic_bulk_update, name=f"api-{bulk_update_url}"))
+        operations.append(path(f"{bulk_delete_url}/", generic_bulk_delete, name=f"api-{bulk_delete_url}"))
+    if exclude is None or CrudOps.AGGREGATE not in exclude:
+        operations.append(path(f"{aggregate_url}/", generic_aggregate, name=f"api-{aggregate_url}"))
+    if exclude is None or CrudOps.EXPORT not in exclude:
+        operations.append(path(f"{export_url}/", generic_export, name=f"api-{export_url}"))
+    if exclude is None or CrudOps.IMPORT not in exclude:
+        operations.append(path(f"{import_url}/", generic_import, name=f"api-{import_url}"))
 
     return operations
 
 
+@api_view(['GET'])
+def response_cache_statistics(request: Request):
+    """ Hits, misses and stale entries of the response cache in this worker process, per model. """
+
+    return Response(statistics())
+
+
+_MAXIMUM_CHANGES = 1000  # Changes read per request to the change feed.
+
+
+@api_view(['GET'])
+def changes(request: Request):
+    """
+    Objects created, updated and deleted since a cursor, like ?since=1234&models=tasks.todo,tasks.team
+    Without ?since=, only the cursor of the newest change is returned, so clients can start syncing after fetching the lists.
+    With ?payload=true, created and updated objects are also serialized, at ?depth= (0 by default).
+    """
+
+    available = logged_models()
+    labels = [label.strip() for label in request.GET['models'].split(',')] if request.GET.get('models') else list(available)
+    if unknown := set(labels) - available.keys():
+        raise ValidationError({'models': [f"Changes aren't logged for: {', '.join(sorted(unknown))}."]})
+    if 'since' not in request.GET:
+        return Response({'changes': {}, 'next': str(head()), 'more': False})
+
+    try:
+        since = int(request.GET['since'])
+    except ValueError:
+        raise ValidationError({'since': ['Expected a cursor returned by this endpoint.']})
+    if since < horizon():
+        return Response({'detail': 'Changes since the cursor have been pruned, fetch the lists again.'}, status=status.HTTP_410_GONE)
+
+    changed, cursor, more = changes_since(since, labels, _MAXIMUM_CHANGES)
+    if request.GET.get('payload', '').lower() in ('true', '1'):
+        try:
+            depth = min(max(int(request.GET.get('depth', 0)), 0), _MAXIMUM_DEPTH)
+        except ValueError:
+            depth = 0
+        for label, model_changes in changed.items():
+            model = available[label]
+            pks = model_changes[CREATED] + model_changes[UPDATED]
+            model_changes['objects'] = serialize_list(generic_serializer(model, depth), model.objects.filter(pk__in=pks)) if pks else []
+    return Response({'changes': changed, 'next': str(cursor), 'more': more})
+
+
 def crud_overview(urls: list[path]) -> None:
     """
     Generate a view listing web API CRUD operations.
@@ -198,7 +873,11 @@ def crud_overview(urls: list[path]) -> None:
         'CREATE': [url.pattern._route for url in urls if url.name.endswith(_CREATE_SUFFIX)],
         'UPDATE': [url.pattern._route for url in urls if url.name.endswith(_UPDATE_SUFFIX)],
         'DELETE': [url.pattern._route for url in urls if url.name.endswith(_DELETE_SUFFIX)],
-        'MODEL': [url.pattern._route for url in urls if url.name.endswith(_INSPECT_SUFFIX)]
+        'MODEL': [url.pattern._route for url in urls if url.name.endswith(_INSPECT_SUFFIX)],
+        'BULK': [url.pattern._route for url in urls if url.name.endswith((_BULK_CREATE_SUFFIX, _BULK_UPDATE_SUFFIX, _BULK_DELETE_SUFFIX))],
+        'AGGREGATE': [url.pattern._route for url in urls if url.name.endswith(_AGGREGATE_SUFFIX)],
+        'EXPORT': [url.pattern._route for url in urls if url.name.endswith(_EXPORT_SUFFIX)],
+        'IMPORT': [url.pattern._route for url in urls if url.name.endswith(_IMPORT_SUFFIX)],
     }
     # overview_dict['OTHER'] = [url.pattern._route for url in urls if url.pattern._route not in set(chain(overview_dict.values()))]
 
@@ -29,7 +29,7 @@ urlpatterns = [
 applist: list[str] = [app for app in apps.app_configs.keys() if app not in {
     'crispy_forms', 'nested_inline', 'staticfiles', 'thumbnail', 'admin',
     'django_tables2', 'contenttypes', 'sessions', 'messages', 'humanize',
-    'rest_framework', 'django_extensions',
+    'rest_framework', 'django_extensions', 'api',
 }]
 
 # TODO Kevin URLs: Perhaps allow for providing a list, by using 'next()'
@@ -12,15 +12,17 @@ from django.template import RequestContext
 from django.urls import reverse_lazy
 from typing import Iterable, Sequence, Type
 from crispy_forms.helper import FormHelper
-from django.db.models import QuerySet, Model
+from django.db.models import QuerySet, Model, Field, ForeignKey
 from crispy_forms.utils import TEMPLATE_PACK
 from django.http import HttpResponseRedirect
 from django.template.loader import render_to_string
 from django.contrib.admin import ModelAdmin, BooleanFieldListFilter, TabularInline
-from django.forms import ModelForm, Form, ChoiceField, inlineformset_factory, MediaDefiningClass
+from django.forms import ModelForm, Form, ChoiceField, ModelChoiceField, inlineformset_factory, MediaDefiningClass
 from django.views.generic import DeleteView, CreateView, ListView, UpdateView
 from crispy_forms.layout import Layout, Div, Fieldset, LayoutObject, HTML, ButtonHolder, Submit
 
+from api.identity_map import lookup, remember
+
 
 class Formset(LayoutObject):
     template = 'frontend/formset.html'
@@ -56,9 +58,34 @@ class GenericAppModelList(ListView):  # Creates a list view consisting of models
         pass
 
 
+class IdentityMapModelChoiceField(ModelChoiceField):
+    """ ModelChoiceField, which looks the chosen object up in the request's identity map before querying it. """
+
+    def to_python(self, value):
+        if value in self.empty_values or (self.to_field_name or 'pk') not in ('pk', self.queryset.model._meta.pk.name):
+            return super().to_python(value)
+        if (instance := lookup(self.queryset, value)) is not None:
+            return instance
+        instance = super().to_python(value)
+        remember(self.queryset, (instance,))
+        return instance
+
+
+def identity_mapped_formfield(db_field: Field, **kwargs):
+    """ formfield_callback of generic forms and inline formsets, so inline rows choosing the same object share it. """
+
+    if isinstance(db_field, ForeignKey):
+        kwargs.setdefault('form_class', IdentityMapModelChoiceField)
+    return db_field.formfield(**kwargs)
+
+
 class GenericForm(ModelForm):
     model: Model = None
 
+    class Meta:
+        # Django 4.1 only passes formfield_callback on to subclasses through Meta.
+        formfield_callback = identity_mapped_formfield
+
     def __init__(self, *args, **kwargs):
         super(GenericForm, self).__init__(*args, **kwargs)
         model_admin = admin.site._registry[self.model]
@@ -382,7 +409,7 @@ class GenericCreateView(AdminDependantMixIn, ABC, CreateView):
                     fields = fieldlist
 
             InlineFormSet = inlineformset_factory(self.model, inline.model, form=gform, extra=inline.extra,
-                                                  can_delete=True)
+                                                  can_delete=True, formfield_callback=identity_mapped_formfield)
 
             inlinelist.append(InlineFormSet)
         if self.request.POST:
@@ -473,7 +500,7 @@ class GenericUpdateView(AdminDependantMixIn, ABC, UpdateView):
                         fields = fieldlist
 
                 InlineFormSet = inlineformset_factory(self.model, inline.model, form=gform, extra=3,
-                                                      can_delete=True)
+                                                      can_delete=True, formfield_callback=identity_mapped_formfield)
 
                 inlinelist.append(InlineFormSet)
 
@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_manager.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.events import EVENTS_PATH, events_application  # Imported once Django is set up.
+
+
+async def application(scope, receive, send):
+    # Server-Sent Events hold their connection open, Django 4.1 can't stream them without holding a thread per connection.
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
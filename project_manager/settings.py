@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'tasks',
     'contoso_university',
     'frontend',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -68,6 +69,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Objects looked up by primary key are only queried once per request, see X-Identity-Map for how often that saved one.
+    'api.identity_map.identity_map_middleware',
 ]
 
 ROOT_URLCONF = 'project_manager.urls'
@@ -147,3 +150,46 @@ STATIC_ROOT = 'static'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Generic web API
+
+# Serializer depths which generic_crud() should build for every model when the server starts.
+# Deep serializers otherwise get built on the first request asking for them.
+API_WARMUP_DEPTHS = ()
+
+# Cache holding the per-model change versions behind the ETags of the web API.
+# Must be shared by every worker process (e.g. Redis or Memcached) when running more than one.
+API_VERSION_CACHE = 'default'
+
+# Cache holding rendered responses of generic_crud() models with a cache_timeout.
+# A LocMemCache keeps them per worker process, a shared backend (e.g. Redis or Memcached) lets workers share hits.
+API_RESPONSE_CACHE = 'default'
+
+# Whether generic_crud() should serve list, detail, create, update and delete views as coroutines.
+# Only useful when served through ASGI, where they don't hold a thread while waiting on the database.
+# Models may override this with generic_crud(asynchronous=...).
+API_ASYNC_VIEWS = False
+
+# Seconds changes are kept in the change log behind /api/changes/, clients with older cursors must fetch the lists again.
+# Changes are compacted and pruned by the compact_changes management command, which should be run periodically.
+API_CHANGE_LOG_RETENTION = 7 * 24 * 60 * 60
+
+# Delivers committed changes to the Server-Sent Events behind /api/events/ (served through ASGI only).
+# LocalBackend reaches subscribers of the same process, RedisBackend (reading API_EVENT_REDIS_URL) those of every worker.
+# RedisBackend needs the redis package, which is optional and not in requirements.txt (pip install redis).
+API_EVENT_BACKEND = 'api.events.LocalBackend'
+
+# Most a single list or detail read may cost, as estimated from the query plan and table sizes before its queries run.
+# Deeper reads are served at a smaller ?depth=, models may override this with generic_crud(query_budget=..., over_budget=...).
+API_QUERY_BUDGET = {'queries': 100, 'rows': 100_000}
+
+# Milliseconds PostgreSQL statements of each class of endpoint may run, before they are canceled and answered with 503.
+API_STATEMENT_TIMEOUTS = {'list': 10_000, 'detail': 2_000, 'aggregate': 10_000, 'write': 5_000, 'export': 10_000}
+
+# Whether identical reads of generic_crud() views in flight at the same time wait on a single evaluation, sharing its response.
+API_COALESCE_READS = True
+
+# Cache to lock flights of identical reads through, so that worker processes wait on each other's evaluations too.
+# Must be shared by every worker process (e.g. Redis or Memcached), None only coalesces reads within each process.
+API_SINGLE_FLIGHT_CACHE = None